@@ -0,0 +1,18 @@
+# Generated by Django 4.2.24 on 2026-10-19 12:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admissions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='admission',
+            name='email',
+            field=models.EmailField(db_index=True, max_length=254),
+        ),
+    ]
@@ -4,12 +4,55 @@ from django.contrib.auth.decorators import login_required
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.utils import timezone
+from django.db.models import Count, Max
+from mini_erp.conditional import etag_condition
+from mini_erp.streaming import list_response, stream_format
 from .models import LeaveApplication, HostelApplication
+import hashlib
 import json
 
+def serialize_leave(leave):
+    return {
+        'id': str(leave.id),
+        'student_id': leave.student.student_id if hasattr(leave.student, 'student_id') else leave.student.username,
+        'student_name': leave.student.get_display_name(),
+        'start_date': leave.start_date.isoformat() if leave.start_date else None,
+        'end_date': leave.end_date.isoformat() if leave.end_date else None,
+        'reason': leave.reason,
+        'status': leave.status,
+        'created_at': leave.created_at.isoformat() if leave.created_at else None
+    }
+
+
+def serialize_hostel_application(app):
+    return {
+        'id': str(app.id),
+        'student_id': app.student.student_id if hasattr(app.student, 'student_id') else app.student.username,
+        'student_name': app.student.get_display_name(),
+        'student_email': app.student.email,
+        'student_phone': app.student.phone if hasattr(app.student, 'phone') else '',
+        'room_type': app.room_type,
+        'preferences': app.preferences,
+        'status': app.status,
+        'created_at': app.created_at.isoformat() if app.created_at else None
+    }
+
+
+def _leaves_etag(request):
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    leaves = LeaveApplication.objects.all()
+    if request.user.is_student():
+        leaves = leaves.filter(student=request.user)
+    state = leaves.aggregate(latest=Max('updated_at'), count=Count('id'))
+    raw = f"{request.path}|{request.GET.urlencode()}|{request.user.pk}|{state['latest']}|{state['count']}"
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
 @csrf_exempt
 @require_http_methods(["GET", "POST"])
 @login_required
+@etag_condition(_leaves_etag)
 def leaves_collection_local(request):
     """Local Django model-based leave applications - fallback when Firebase is unavailable"""
     
@@ -20,21 +63,12 @@ def leaves_collection_local(request):
         else:
             # Admin/Faculty can see all
             leaves = LeaveApplication.objects.all().order_by('-created_at')
+        leaves = leaves.select_related('student')
+        if stream_format(request):
+            # Server-side cursor: rows are fetched and encoded in chunks
+            leaves = leaves.iterator(chunk_size=500)
         
-        data = []
-        for leave in leaves:
-            data.append({
-                'id': str(leave.id),
-                'student_id': leave.student.student_id if hasattr(leave.student, 'student_id') else leave.student.username,
-                'student_name': leave.student.get_display_name(),
-                'start_date': leave.start_date.isoformat() if leave.start_date else None,
-                'end_date': leave.end_date.isoformat() if leave.end_date else None,
-                'reason': leave.reason,
-                'status': leave.status,
-                'created_at': leave.created_at.isoformat() if leave.created_at else None
-            })
-        
-        return JsonResponse({'items': data})
+        return list_response(request, (serialize_leave(leave) for leave in leaves))
     
     elif request.method == 'POST':
         try:
@@ -80,21 +114,7 @@ def hostel_applications_collection_local(request):
             # Admin/Faculty can see all
             applications = HostelApplication.objects.all().order_by('-created_at')
         
-        data = []
-        for app in applications:
-            data.append({
-                'id': str(app.id),
-                'student_id': app.student.student_id if hasattr(app.student, 'student_id') else app.student.username,
-                'student_name': app.student.get_display_name(),
-                'student_email': app.student.email,
-                'student_phone': app.student.phone if hasattr(app.student, 'phone') else '',
-                'room_type': app.room_type,
-                'preferences': app.preferences,
-                'status': app.status,
-                'created_at': app.created_at.isoformat() if app.created_at else None
-            })
-        
-        return JsonResponse({'items': data})
+        return JsonResponse({'items': [serialize_hostel_application(app) for app in applications]})
     
     elif request.method == 'POST':
         try:
@@ -0,0 +1,38 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.risk_engine import MONTH_FIELDS, evaluate_month, group_by_month
+from dashboard.risk_history import record_snapshot
+from mini_erp.firebase_utils import get_all_documents
+
+
+class Command(BaseCommand):
+    help = 'Append today\'s per-student month-to-date risk sample to the history store and refresh the monthly rollup (run nightly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date',
+            type=str,
+            help='Snapshot date as YYYY-MM-DD (defaults to today)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            day = date.fromisoformat(options['date']) if options.get('date') else date.today()
+        except ValueError:
+            raise CommandError('--date must be YYYY-MM-DD')
+
+        # Same per-month figures the trend chart recomputes for months without a rollup
+        month = day.strftime('%Y-%m')
+        docs = [
+            group_by_month(get_all_documents(collection), field, [month])[month]
+            for collection, field in MONTH_FIELDS.items()
+        ]
+        results = evaluate_month(*docs)
+
+        rollup = record_snapshot(results, day)
+        self.stdout.write(self.style.SUCCESS(
+            f'Recorded {len(results)} risk samples for {day.isoformat()} '
+            f'(month {rollup.month}: High {rollup.high}, Medium {rollup.medium}, Low {rollup.low})'
+        ))
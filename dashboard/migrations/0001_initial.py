@@ -0,0 +1,47 @@
+# Generated by Django 4.2.24 on 2026-10-19 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RiskRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.CharField(help_text='YYYY-MM', max_length=7, unique=True)),
+                ('high', models.PositiveIntegerField(default=0)),
+                ('medium', models.PositiveIntegerField(default=0)),
+                ('low', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['month'],
+            },
+        ),
+        migrations.CreateModel(
+            name='StudentRiskHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('student_id', models.CharField(max_length=20)),
+                ('month', models.CharField(help_text='YYYY-MM', max_length=7)),
+                ('scores', models.BinaryField(default=bytes)),
+                ('levels', models.BinaryField(default=bytes)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['month', 'student_id'],
+                'indexes': [models.Index(fields=['month'], name='risk_history_month_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='studentriskhistory',
+            constraint=models.UniqueConstraint(fields=('student_id', 'month'), name='uniq_risk_history_student_month'),
+        ),
+    ]
@@ -1,3 +1,71 @@
+from array import array
+
 from django.db import models
 
-# Create your models here.
+# Marker for days without a snapshot in the per-month arrays
+NO_SAMPLE = 255
+
+LEVEL_CODES = {'Low': 0, 'Medium': 1, 'High': 2}
+LEVEL_NAMES = {code: name for name, code in LEVEL_CODES.items()}
+
+
+class StudentRiskHistory(models.Model):
+    """Daily risk samples for one student in one month.
+    Scores and level codes are stored as compact byte arrays indexed by day-of-month - 1,
+    so a year of history for a student is 12 rows instead of 365.
+    """
+    student_id = models.CharField(max_length=20)
+    month = models.CharField(max_length=7, help_text='YYYY-MM')
+    scores = models.BinaryField(default=bytes)
+    levels = models.BinaryField(default=bytes)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['month', 'student_id']
+        constraints = [
+            models.UniqueConstraint(fields=['student_id', 'month'], name='uniq_risk_history_student_month'),
+        ]
+        indexes = [
+            models.Index(fields=['month'], name='risk_history_month_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.student_id} {self.month}"
+
+    @staticmethod
+    def _as_array(raw):
+        values = array('B', bytes(raw or b''))
+        if len(values) < 31:
+            values.extend([NO_SAMPLE] * (31 - len(values)))
+        return values
+
+    def record(self, day: int, score: int, level: str):
+        """Set the sample for a day of the month (1-31)."""
+        scores = self._as_array(self.scores)
+        levels = self._as_array(self.levels)
+        scores[day - 1] = min(int(score), NO_SAMPLE - 1)
+        levels[day - 1] = LEVEL_CODES.get(level, 0)
+        self.scores = scores.tobytes()
+        self.levels = levels.tobytes()
+
+    def latest_level(self):
+        """Return the level name of the most recent sample in the month, or None."""
+        for code in reversed(self._as_array(self.levels)):
+            if code != NO_SAMPLE:
+                return LEVEL_NAMES.get(code)
+        return None
+
+
+class RiskRollup(models.Model):
+    """Monthly High/Medium/Low counts precomputed from StudentRiskHistory."""
+    month = models.CharField(max_length=7, unique=True, help_text='YYYY-MM')
+    high = models.PositiveIntegerField(default=0)
+    medium = models.PositiveIntegerField(default=0)
+    low = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['month']
+
+    def __str__(self):
+        return f"{self.month}: H{self.high}/M{self.medium}/L{self.low}"
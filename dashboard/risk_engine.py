@@ -0,0 +1,291 @@
+"""
+Batch risk evaluation over bulk Firestore snapshots.
+
+evaluate_risk() in students.views issues three queries per student; the
+functions here evaluate every student from one pass over the cached
+attendance, fees and exams collections instead.
+"""
+import bisect
+import threading
+from array import array
+from datetime import date
+
+from .risk_rules import get_risk_rules
+
+INF = float('inf')
+
+# Ranking keys for at-risk listings. Every key ends with student_id so keys are
+# unique and can double as keyset pagination cursors.
+SORT_KEYS = {
+    'risk': lambda r: (-len(r['reasons']), r['attendance_percent'], r['student_id']),
+    'score': lambda r: (-r['risk_score'], r['attendance_percent'], r['student_id']),
+    'attendance': lambda r: (r['attendance_percent'], r['student_id']),
+    'student_id': lambda r: (r['student_id'],),
+}
+# Element types of each sort key, for validating client-supplied cursors
+SORT_KEY_TYPES = {
+    'risk': (int, float, str),
+    'score': (float, float, str),
+    'attendance': (float, str),
+    'student_id': (str,),
+}
+
+
+def check_sort_key(sort: str, key) -> tuple:
+    """Return key as a tuple comparable with SORT_KEYS[sort] values; ValueError if it has the wrong shape."""
+    types = SORT_KEY_TYPES.get(sort)
+    if types is None:
+        raise ValueError(f'Unknown sort: {sort}')
+    if not isinstance(key, (list, tuple)) or len(key) != len(types):
+        raise ValueError(f'Cursor does not match sort {sort}')
+    for value, expected in zip(key, types):
+        # JSON numbers decode as int or float; bool is an int subclass but never a valid key
+        numeric = expected is not str
+        if isinstance(value, bool) or not isinstance(value, (int, float) if numeric else str):
+            raise ValueError(f'Cursor does not match sort {sort}')
+    return tuple(key)
+
+
+_index_lock = threading.Lock()
+_index_entry = None  # (cache key, RiskIndex)
+
+
+def load_risk_collections(ttl_seconds: int = 15):
+    """Return (attendance, fees, exams) documents using cached reads and snapshot watchers."""
+    from mini_erp.firebase_utils import get_all_documents_cached, start_snapshot_watch
+    docs = []
+    for col in ['attendance', 'fees', 'exams']:
+        start_snapshot_watch(col)
+        docs.append(get_all_documents_cached(col, ttl_seconds=ttl_seconds))
+    return tuple(docs)
+
+
+def parse_risk_columns(attendance_docs, fee_docs, exam_docs, today: str | None = None, is_overdue=None):
+    """Reduce raw documents to per-student numeric columns in one pass per collection.
+    Returns (student_ids, attendance_percent, overdue_fees, min_exam_percent) as
+    parallel sequences. is_overdue(doc) overrides the default due-date check.
+    """
+    today = today or date.today().isoformat()
+    if is_overdue is None:
+        def is_overdue(d):
+            due = d.get('due_date')
+            return bool(due and due < today and (d.get('status') or 'pending').lower() != 'completed')
+
+    att = {}
+    for d in attendance_docs:
+        sid = d.get('student_id')
+        if not sid:
+            continue
+        total, present = att.get(sid, (0, 0))
+        att[sid] = (total + 1, present + (1 if d.get('present') is True else 0))
+
+    overdue = {}
+    for d in fee_docs:
+        sid = d.get('student_id')
+        if sid and not overdue.get(sid):
+            overdue[sid] = is_overdue(d)
+
+    min_exam = {}
+    for d in exam_docs:
+        sid = d.get('student_id')
+        if not sid:
+            continue
+        try:
+            pct = (float(d.get('score', 0)) / (float(d.get('total', 100)) or 100.0)) * 100.0
+        except Exception:
+            continue
+        if pct < min_exam.get(sid, INF):
+            min_exam[sid] = pct
+
+    student_ids = list(set(att) | set(overdue) | set(min_exam))
+    attendance_percent = array('d')
+    for sid in student_ids:
+        total, present = att.get(sid, (0, 0))
+        attendance_percent.append(round((present / total) * 100, 2) if total > 0 else 100.0)
+    overdue_fees = [overdue.get(sid, False) for sid in student_ids]
+    min_exam_percent = array('d', (min_exam.get(sid, INF) for sid in student_ids))
+    return student_ids, attendance_percent, overdue_fees, min_exam_percent
+
+
+# Date field that places each collection's documents in a month (YYYY-MM prefix)
+MONTH_FIELDS = {'attendance': 'date', 'fees': 'due_date', 'exams': 'exam_date'}
+
+
+def group_by_month(docs, field: str, months) -> dict:
+    """{month: [docs]} for the given YYYY-MM months, keyed on the first 7 chars of doc[field]."""
+    grouped = {m: [] for m in months}
+    for d in docs:
+        bucket = grouped.get((d.get(field) or '')[:7])
+        if bucket is not None:
+            bucket.append(d)
+    return grouped
+
+
+def evaluate_month(attendance_docs, fee_docs, exam_docs) -> dict:
+    """Per-month risk for the documents of one month (see group_by_month / MONTH_FIELDS).
+    Attendance counts only that month, a fee due that month is overdue unless completed,
+    and grades fail if any exam that month is below the fail percentage. Returns
+    {student_id: {'risk_score', 'risk_level'}}. Both the nightly history samples and
+    the recomputed trend months use this, so every point of a trend means the same thing.
+    """
+    rules = get_risk_rules()
+    student_ids, attendance_percent, overdue_fees, min_exam_percent = parse_risk_columns(
+        attendance_docs, fee_docs, exam_docs,
+        is_overdue=lambda f: (f.get('status') or 'pending').lower() != 'completed',
+    )
+    failing_grades = [rules.is_failing_percent(p) for p in min_exam_percent]
+    scores, levels = rules.evaluate_columns(attendance_percent, overdue_fees, failing_grades)
+    return {
+        sid: {'risk_score': scores[i], 'risk_level': levels[i]}
+        for i, sid in enumerate(student_ids)
+    }
+
+
+def evaluate_students(attendance_docs, fee_docs, exam_docs, today: str | None = None,
+                      attendance_threshold: float | None = None):
+    """Evaluate risk for every student found in the given documents.
+    Returns {student_id: risk} where risk has the same keys as evaluate_risk()
+    plus risk_score and risk_level.
+    """
+    rules = get_risk_rules()
+    student_ids, attendance_percent, overdue_fees, min_exam_percent = parse_risk_columns(
+        attendance_docs, fee_docs, exam_docs, today=today)
+    failing_grades = [rules.is_failing_percent(p) for p in min_exam_percent]
+    scores, levels = rules.evaluate_columns(attendance_percent, overdue_fees, failing_grades)
+
+    results = {}
+    for i, sid in enumerate(student_ids):
+        pct, od, fl = attendance_percent[i], overdue_fees[i], failing_grades[i]
+        reasons = rules.reasons(pct, od, fl, attendance_threshold)
+        results[sid] = {
+            'student_id': sid,
+            'at_risk': len(reasons) > 0,
+            'attendance_percent': pct,
+            'overdue_fees': od,
+            'failing_grades': fl,
+            'reasons': reasons,
+            'risk_score': scores[i],
+            'risk_level': levels[i],
+        }
+    return results
+
+
+class RiskIndex:
+    """Evaluated risk for all students plus per-sort rankings of the at-risk subset.
+    Rankings are sorted once per sort on first use and shared by every request
+    until the index is rebuilt; a page of k rows is then a bisect on the keys
+    (for a cursor) plus a slice.
+
+    Attendance ratios are also kept in a sorted array, so the students under any
+    attendance threshold are a bisect plus a slice (see with_threshold).
+    """
+
+    def __init__(self, results: dict, threshold: float):
+        self.results = results
+        self.threshold = threshold
+        self._rankings = {}
+        self._derived = {}
+        ranked = sorted((r['attendance_percent'], sid) for sid, r in results.items())
+        self._att_values = array('d', (pct for pct, _ in ranked))
+        self._att_ids = [sid for _, sid in ranked]
+        self._flagged_other = {sid for sid, r in results.items() if r['overdue_fees'] or r['failing_grades']}
+
+    def attendance_below(self, threshold: float) -> list:
+        """Student ids with attendance strictly below threshold, lowest first."""
+        return self._att_ids[:bisect.bisect_left(self._att_values, threshold)]
+
+    def at_risk_count_for(self, threshold: float) -> int:
+        """At-risk count for a threshold without materializing the listing."""
+        below = self.attendance_below(threshold)
+        return len(self._flagged_other) + sum(1 for sid in below if sid not in self._flagged_other)
+
+    def with_threshold(self, threshold: float) -> 'RiskIndex':
+        """Return an index whose at-risk set and reasons use the given attendance threshold.
+        Only the at-risk students for that threshold are re-derived; scores are unchanged.
+        """
+        if threshold == self.threshold:
+            return self
+        derived = self._derived.get(threshold)
+        if derived is not None:
+            return derived
+        rules = get_risk_rules()
+        results = {}
+        for sid in set(self.attendance_below(threshold)) | self._flagged_other:
+            base = self.results[sid]
+            reasons = rules.reasons(base['attendance_percent'], base['overdue_fees'], base['failing_grades'], threshold)
+            results[sid] = {**base, 'reasons': reasons, 'at_risk': True}
+        derived = RiskIndex(results, threshold)
+        if len(self._derived) >= 16:
+            self._derived.pop(next(iter(self._derived)))
+        self._derived[threshold] = derived
+        return derived
+
+    def _ranking(self, sort: str):
+        """(keys, student_ids) of at-risk students in sort order."""
+        ranking = self._rankings.get(sort)
+        if ranking is None:
+            key = SORT_KEYS[sort]
+            ranked = sorted((key(r), r['student_id']) for r in self.results.values() if r['at_risk'])
+            ranking = ([k for k, _ in ranked], [sid for _, sid in ranked])
+            self._rankings[sort] = ranking
+        return ranking
+
+    def at_risk_count(self) -> int:
+        return len(self._ranking('risk')[0])
+
+    def level_counts(self) -> dict:
+        counts = {'High': 0, 'Medium': 0, 'Low': 0}
+        for r in self.results.values():
+            if r['at_risk']:
+                counts[r['risk_level']] = counts.get(r['risk_level'], 0) + 1
+        return counts
+
+    def page(self, sort: str = 'risk', limit: int | None = None, offset: int = 0, after: tuple | None = None):
+        """Return (items, total, next_after) for at-risk students ordered by sort.
+        after is the sort key of the last row of the previous page (keyset cursor);
+        ValueError if it does not match the sort.
+        """
+        keys, ids = self._ranking(sort)
+        start = offset
+        if after is not None:
+            start += bisect.bisect_right(keys, check_sort_key(sort, after))
+        end = len(keys) if limit is None else min(len(keys), start + limit)
+        items = [self.results[sid] for sid in ids[start:end]]
+        has_more = end < len(keys)
+        next_after = keys[end - 1] if (has_more and end > start) else None
+        return items, len(keys), next_after
+
+
+def get_risk_index(ttl_seconds: int = 15) -> RiskIndex:
+    """Return the shared RiskIndex, rebuilding it only when the cached collections changed."""
+    global _index_entry
+    from mini_erp.firebase_utils import get_collection_version
+    attendance, fees, exams = load_risk_collections(ttl_seconds)
+    today = date.today().isoformat()
+    rules = get_risk_rules()
+    key = (today, rules.version) + tuple(get_collection_version(c) for c in ['attendance', 'fees', 'exams'])
+    with _index_lock:
+        if _index_entry and _index_entry[0] == key:
+            return _index_entry[1]
+    index = RiskIndex(evaluate_students(attendance, fees, exams, today=today), rules.attendance_threshold)
+    with _index_lock:
+        _index_entry = (key, index)
+    return index
+
+
+def student_risk(student_id: str, ttl_seconds: int = 15) -> dict:
+    """Risk row for one student from the shared index; students without records are not at risk."""
+    risk = get_risk_index(ttl_seconds).results.get(student_id)
+    if risk is not None:
+        return risk
+    score, level = get_risk_rules().score_and_level(100.0, False, False)
+    return {
+        'student_id': student_id,
+        'at_risk': False,
+        'attendance_percent': 100.0,
+        'overdue_fees': False,
+        'failing_grades': False,
+        'reasons': [],
+        'risk_score': score,
+        'risk_level': level,
+    }
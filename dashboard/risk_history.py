@@ -0,0 +1,65 @@
+"""
+Risk history store: daily per-student samples plus monthly rollups.
+
+The nightly snapshot_risk command appends today's score/level for every
+student and refreshes the rollup for the current month, so trend charts are
+a range scan over RiskRollup rather than a recomputation from raw data.
+Samples are month-to-date figures from risk_engine.evaluate_month, the same
+computation the trend uses for months that have no rollup yet.
+"""
+from datetime import date
+
+from django.db import transaction
+
+from .models import StudentRiskHistory, RiskRollup
+
+
+def record_snapshot(results: dict, day: date | None = None):
+    """Store one day's sample for each evaluated student and refresh that month's rollup.
+    results is the {student_id: risk} mapping produced by risk_engine.evaluate_month.
+    """
+    day = day or date.today()
+    month = day.strftime('%Y-%m')
+    existing = {
+        h.student_id: h
+        for h in StudentRiskHistory.objects.filter(month=month, student_id__in=list(results))
+    }
+    to_create, to_update = [], []
+    for sid, risk in results.items():
+        history = existing.get(sid)
+        if history is None:
+            history = StudentRiskHistory(student_id=sid, month=month)
+            to_create.append(history)
+        else:
+            to_update.append(history)
+        history.record(day.day, risk.get('risk_score', 0), risk.get('risk_level', 'Low'))
+    with transaction.atomic():
+        StudentRiskHistory.objects.bulk_create(to_create, batch_size=500)
+        StudentRiskHistory.objects.bulk_update(to_update, ['scores', 'levels'], batch_size=500)
+        rollup = rebuild_rollup(month)
+    return rollup
+
+
+def rebuild_rollup(month: str):
+    """Recount High/Medium/Low for a month using each student's latest sample."""
+    counts = {'High': 0, 'Medium': 0, 'Low': 0}
+    for history in StudentRiskHistory.objects.filter(month=month).only('levels').iterator(chunk_size=1000):
+        level = history.latest_level()
+        if level in counts:
+            counts[level] += 1
+    rollup, _ = RiskRollup.objects.update_or_create(
+        month=month,
+        defaults={'high': counts['High'], 'medium': counts['Medium'], 'low': counts['Low']},
+    )
+    return rollup
+
+
+def rollup_trend(months: list[str]):
+    """Return {month: {'month', 'high', 'medium', 'low'}} for the months that have rollups."""
+    if not months:
+        return {}
+    rows = RiskRollup.objects.filter(month__gte=min(months), month__lte=max(months))
+    return {
+        r.month: {'month': r.month, 'high': r.high, 'medium': r.medium, 'low': r.low}
+        for r in rows
+    }
@@ -0,0 +1,155 @@
+"""
+Declarative risk rules compiled once and shared by every risk calculation.
+
+The rule set comes from settings.RISK_RULES, optionally overridden by the JSON
+file at settings.RISK_RULES_PATH. The file is re-read when its mtime changes,
+so thresholds and weights can be tuned without restarting workers.
+"""
+import bisect
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RISK_RULES = {
+    # Attendance below this flags a student as at-risk
+    'attendance_threshold': 75.0,
+    # An exam percentage below this counts as a failing grade
+    'fail_grade_percent': 40.0,
+    # [cutoff, weight]: attendance below the lowest matching cutoff adds weight
+    'attendance_bands': [[50.0, 2], [75.0, 1]],
+    'overdue_fees_weight': 1,
+    'failing_grades_weight': 2,
+    # Minimum score for each level
+    'levels': {'Low': 0, 'Medium': 1, 'High': 3},
+}
+
+# Seconds between mtime checks of RISK_RULES_PATH
+_RELOAD_CHECK_SECONDS = 5
+
+_lock = threading.Lock()
+_compiled = None
+_source_key = None
+_last_check = 0.0
+
+
+class CompiledRiskRules:
+    """Risk rules with thresholds pre-sorted for bisect lookups.
+    Scalar helpers serve single-student callers; evaluate_columns() scores
+    pre-parsed numeric columns for batch callers.
+    """
+
+    def __init__(self, spec: dict):
+        self.spec = spec
+        self.version = hashlib.sha1(json.dumps(spec, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+        self.attendance_threshold = float(spec['attendance_threshold'])
+        self.fail_grade_percent = float(spec['fail_grade_percent'])
+        self.overdue_weight = int(spec['overdue_fees_weight'])
+        self.failing_weight = int(spec['failing_grades_weight'])
+        bands = sorted((float(cutoff), int(weight)) for cutoff, weight in spec['attendance_bands'])
+        self._band_cutoffs = [cutoff for cutoff, _ in bands]
+        self._band_weights = [weight for _, weight in bands] + [0]
+        levels = sorted((int(min_score), name) for name, min_score in spec['levels'].items())
+        self._level_mins = [min_score for min_score, _ in levels]
+        self._level_names = [name for _, name in levels]
+
+    def attendance_weight(self, attendance_percent: float) -> int:
+        return self._band_weights[bisect.bisect_right(self._band_cutoffs, attendance_percent)]
+
+    def level_for(self, score: int) -> str:
+        idx = bisect.bisect_right(self._level_mins, score) - 1
+        return self._level_names[max(idx, 0)]
+
+    def score_and_level(self, attendance_percent: float, overdue_fees: bool, failing_grades: bool):
+        score = self.attendance_weight(attendance_percent)
+        if overdue_fees:
+            score += self.overdue_weight
+        if failing_grades:
+            score += self.failing_weight
+        return score, self.level_for(score)
+
+    def is_failing_percent(self, percent: float) -> bool:
+        return percent < self.fail_grade_percent
+
+    def reasons(self, attendance_percent: float, overdue_fees: bool, failing_grades: bool,
+                attendance_threshold: float | None = None) -> list:
+        threshold = self.attendance_threshold if attendance_threshold is None else attendance_threshold
+        reasons = []
+        if attendance_percent < threshold:
+            reasons.append(f"Attendance {attendance_percent}% < {threshold}%")
+        if overdue_fees:
+            reasons.append("Overdue fee(s)")
+        if failing_grades:
+            reasons.append("Failing grades")
+        return reasons
+
+    def evaluate_columns(self, attendance_percent, overdue_fees, failing_grades):
+        """Score parallel columns (attendance %, overdue flag, failing flag).
+        Returns (scores, levels) lists aligned with the inputs.
+        """
+        aw = self.attendance_weight
+        ow, fw = self.overdue_weight, self.failing_weight
+        scores = [
+            aw(pct) + (ow if od else 0) + (fw if fl else 0)
+            for pct, od, fl in zip(attendance_percent, overdue_fees, failing_grades)
+        ]
+        level_for = self.level_for
+        return scores, [level_for(s) for s in scores]
+
+
+def _load_spec():
+    """Merge defaults, settings.RISK_RULES and the optional JSON override file."""
+    spec = dict(DEFAULT_RISK_RULES)
+    spec.update(getattr(settings, 'RISK_RULES', None) or {})
+    path = getattr(settings, 'RISK_RULES_PATH', None)
+    if path and os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as fh:
+                spec.update(json.load(fh))
+        except Exception as e:
+            logger.error(f'Could not load risk rules from {path}: {e}')
+    return spec
+
+
+def get_risk_rules() -> CompiledRiskRules:
+    """Return the compiled rule set, recompiling when settings or the rules file change."""
+    global _compiled, _source_key, _last_check
+    now = time.time()
+    with _lock:
+        if _compiled is not None and now - _last_check < _RELOAD_CHECK_SECONDS:
+            return _compiled
+        _last_check = now
+    path = getattr(settings, 'RISK_RULES_PATH', None)
+    mtime = os.path.getmtime(path) if path and os.path.exists(path) else None
+    key = (json.dumps(getattr(settings, 'RISK_RULES', None) or {}, sort_keys=True), path, mtime)
+    with _lock:
+        if _compiled is not None and key == _source_key:
+            return _compiled
+    spec = _load_spec()
+    try:
+        compiled = CompiledRiskRules(spec)
+    except Exception as e:
+        logger.error(f'Invalid risk rules, keeping previous set: {e}')
+        with _lock:
+            if _compiled is not None:
+                return _compiled
+        compiled = CompiledRiskRules(DEFAULT_RISK_RULES)
+    with _lock:
+        _compiled, _source_key = compiled, key
+    return compiled
+
+
+@receiver(setting_changed)
+def _reset_rules(sender, setting, **kwargs):
+    global _compiled, _source_key
+    if setting in ('RISK_RULES', 'RISK_RULES_PATH'):
+        with _lock:
+            _compiled, _source_key = None, None
@@ -15,6 +15,7 @@ urlpatterns = [
     # Existing realtime JSON/SSE endpoints
     path('at-risk/', views.at_risk_json, name='at_risk_json'),
     path('at-risk/stream/', views.at_risk_stream, name='at_risk_stream'),
+    path('at-risk/sweep/', views.at_risk_threshold_sweep, name='at_risk_sweep'),
     path('analytics/', views.analytics_json, name='analytics_json'),
     path('analytics/stream/', views.analytics_stream, name='analytics_stream'),
 ]
@@ -5,9 +5,11 @@ from mini_erp.firebase_utils import get_collection_count, get_all_documents
 from admissions.models import Admission
 from fees.models import FeePayment
 from hostel.models import HostelCapacity, HostelAllocation
-from mini_erp.auth import role_required, user_in_groups
+from mini_erp.auth import get_student_id_for_user, role_required, user_in_groups
+from mini_erp.conditional import collection_etag, etag_condition
 import logging
 import json
+import base64
 import time
 from datetime import date
 
@@ -61,32 +63,6 @@ def admin_dashboard(request):
 # Predictive Intervention Dashboard
 # -----------------------------
 
-def _risk_score_and_level(attendance_percent: float, overdue_fees: bool, failing_grades: bool):
-    """Compute a lightweight risk score and discrete level.
-    Heuristic:
-    - Attendance <50% => +2, <75% => +1
-    - Overdue fees => +1
-    - Failing grades => +2
-    Levels: 0 = Low, 1-2 = Medium, >=3 = High
-    """
-    score = 0
-    if attendance_percent < 50:
-        score += 2
-    elif attendance_percent < 75:
-        score += 1
-    if overdue_fees:
-        score += 1
-    if failing_grades:
-        score += 2
-    if score >= 3:
-        level = 'High'
-    elif score >= 1:
-        level = 'Medium'
-    else:
-        level = 'Low'
-    return score, level
-
-
 @login_required
 def predictive_dashboard(request):
     """Render the predictive dashboard UI (cards, table, charts, alerts)."""
@@ -102,22 +78,23 @@ def students_data_json(request):
     # Allow admin and counselor access
     if not (request.user.is_admin() or user_in_groups(request.user, ['counselor'])):
         return HttpResponseForbidden('Access denied. Admin or counselor role required.')
-    try:
-        threshold = float(request.GET.get('attendance_threshold', '75'))
-    except ValueError:
-        threshold = 75.0
+    threshold = _threshold_param(request)
 
-    # Reuse existing evaluator
-    data = _evaluate_all_students(threshold)
-    enriched = []
-    for item in data:
-        score, level = _risk_score_and_level(item.get('attendance_percent', 100.0), item.get('overdue_fees', False), item.get('failing_grades', False))
-        enriched.append({
-            **item,
-            'risk_score': score,
-            'risk_level': level,
-        })
-    return JsonResponse({'items': enriched})
+    try:
+        sort, limit, offset, after = _page_params(request)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    # Batch evaluator already attaches risk_score and risk_level
+    from .risk_engine import get_risk_index
+    index = get_risk_index().with_threshold(threshold)
+    items, total, next_after = index.page(sort=sort, limit=limit, offset=offset, after=after)
+    return JsonResponse({
+        'items': items,
+        'total': total,
+        'counts': index.level_counts(),
+        'next_cursor': _encode_cursor(sort, next_after),
+    })
 
 
 @login_required
@@ -126,29 +103,14 @@ def alerts_json(request):
     # Allow admin and counselor access
     if not (request.user.is_admin() or user_in_groups(request.user, ['counselor'])):
         return HttpResponseForbidden('Access denied. Admin or counselor role required.')
-    from mini_erp.firebase_utils import get_all_documents_cached, start_snapshot_watch
-    start_snapshot_watch('notifications')
-    docs = get_all_documents_cached('notifications', ttl_seconds=10)
-    # Sort by created_at desc if available
-    try:
-        docs.sort(key=lambda d: d.get('created_at') or '', reverse=True)
-    except Exception:
-        pass
-    return JsonResponse({'items': docs[:50]})
-
-
-def _get_student_id_for_user(user):
-    """Map logged-in user to their student_id. Prefer user.student_id, fallback to Admission.email mapping."""
+    from students.inbox import list_notifications, unread_count
     try:
-        if not user.is_authenticated:
-            return None
-        sid = getattr(user, 'student_id', None)
-        if sid:
-            return sid
-        adm = Admission.objects.filter(email=user.email).first()
-        return adm.student_id if adm else None
-    except Exception:
-        return None
+        limit = min(max(int(request.GET.get('limit', 50)), 1), 200)
+    except ValueError:
+        return JsonResponse({'error': 'limit must be an integer'}, status=400)
+    # Newest-first page read straight from the created_at index
+    items, next_cursor = list_notifications(limit=limit, after_id=request.GET.get('cursor') or None)
+    return JsonResponse({'items': items, 'unread': unread_count(), 'next_cursor': next_cursor})
 
 
 @login_required
@@ -160,84 +122,85 @@ def my_dashboard(request):
     return render(request, 'dashboard/dashboard.html', {'self_mode': True})
 
 
+def _risk_inputs_version(request):
+    from .risk_rules import get_risk_rules
+    return f"{date.today().isoformat()}:{get_risk_rules().version}"
+
+
 @login_required
+@etag_condition(collection_etag('attendance', 'fees', 'exams', extra=_risk_inputs_version))
 def my_summary_json(request):
     """Return self-only risk summary for the logged-in student using cached Firestore reads."""
-    sid = _get_student_id_for_user(request.user)
+    sid = get_student_id_for_user(request.user)
     if not sid:
         return JsonResponse({'error': 'No linked student_id for this user'}, status=404)
     try:
-        from mini_erp.firebase_utils import get_all_documents_cached, start_snapshot_watch
-        for col in ['attendance', 'fees', 'exams']:
-            start_snapshot_watch(col)
-        att_docs = [d for d in get_all_documents_cached('attendance', ttl_seconds=15) if d.get('student_id') == sid]
-        fee_docs = [d for d in get_all_documents_cached('fees', ttl_seconds=15) if d.get('student_id') == sid]
-        exam_docs = [d for d in get_all_documents_cached('exams', ttl_seconds=15) if d.get('student_id') == sid]
-        # Compute attendance percent
-        total = len(att_docs)
-        present = sum(1 for d in att_docs if d.get('present') is True)
-        attendance_percent = round((present / total) * 100.0, 2) if total > 0 else 100.0
-        # Overdue fees
-        from datetime import date as _date
-        today = _date.today().isoformat()
-        overdue = any(((fd.get('status') or 'pending').lower() != 'completed') and fd.get('due_date') and fd['due_date'] < today for fd in fee_docs)
-        # Failing grades
-        failing = False
-        for e in exam_docs:
-            try:
-                score = float(e.get('score', 0))
-                tot = float(e.get('total', 100) or 100)
-                if (score / tot) * 100.0 < 40.0:
-                    failing = True
-                    break
-            except Exception:
-                continue
-        # Score and level
-        score, level = _risk_score_and_level(attendance_percent, overdue, failing)
-        risk = {
-            'student_id': sid,
-            'attendance_percent': attendance_percent,
-            'overdue_fees': overdue,
-            'failing_grades': failing,
-            'reasons': [
-                *([f"Attendance {attendance_percent}% < 75.0%"] if attendance_percent < 75.0 else []),
-                *(["Overdue fee(s)"] if overdue else []),
-                *(["Failing grades"] if failing else []),
-            ],
-            'risk_score': score,
-            'risk_level': level,
-            'at_risk': score >= 1,
-        }
-        return JsonResponse({'item': risk})
+        # Shared batch evaluation; students without any records are not at risk
+        from .risk_engine import student_risk
+        return JsonResponse({'item': student_risk(sid)})
     except Exception as e:
         return JsonResponse({'error': f'Risk calculation failed: {e}'}, status=500)
 
 
 # Predictive: at-risk students
 
-def _evaluate_all_students(attendance_threshold: float = 75.0):
-    # Collect unique student_ids from Firestore collections
-    ids = set()
-    from mini_erp.firebase_utils import get_all_documents_cached, start_snapshot_watch
-    for col in ['attendance', 'fees', 'exams']:
-        try:
-            start_snapshot_watch(col)
-            for d in get_all_documents_cached(col, ttl_seconds=15):
-                sid = d.get('student_id')
-                if sid:
-                    ids.add(sid)
-        except Exception:
-            continue
-    # Compute risk per student
-    from students.views import evaluate_risk  # reuse logic
-    at_risk = []
-    for sid in ids:
-        risk = evaluate_risk(sid)
-        if risk['at_risk']:
-            at_risk.append(risk)
-    # Sort by number of reasons desc, then lowest attendance
-    at_risk.sort(key=lambda r: (-(len(r['reasons'])), r['attendance_percent']))
-    return at_risk
+def _evaluate_all_students(attendance_threshold: float | None = None):
+    """Full at-risk list sorted by number of reasons desc, then lowest attendance."""
+    from .risk_engine import get_risk_index
+    index = get_risk_index()
+    if attendance_threshold is not None:
+        index = index.with_threshold(attendance_threshold)
+    items, _, _ = index.page(sort='risk')
+    return items
+
+
+def _threshold_param(request) -> float:
+    from .risk_rules import get_risk_rules
+    default = get_risk_rules().attendance_threshold
+    try:
+        return float(request.GET.get('attendance_threshold') or default)
+    except ValueError:
+        return default
+
+
+def _page_params(request):
+    """Parse sort/limit/offset/cursor query params for at-risk listings.
+    Raises ValueError with a client-facing message on bad input.
+    """
+    from .risk_engine import SORT_KEYS
+    sort = request.GET.get('sort') or 'risk'
+    if sort not in SORT_KEYS:
+        raise ValueError(f"sort must be one of: {', '.join(SORT_KEYS)}")
+    try:
+        limit = request.GET.get('limit')
+        limit = max(1, min(int(limit), 1000)) if limit else None
+        offset = max(0, int(request.GET.get('offset') or 0))
+    except ValueError:
+        raise ValueError('limit and offset must be integers')
+    after = _decode_cursor(request.GET.get('cursor'), sort)
+    return sort, limit, offset, after
+
+
+def _encode_cursor(sort, key):
+    if key is None:
+        return None
+    payload = {'sort': sort, 'key': list(key)}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode('utf-8')).decode('ascii')
+
+
+def _decode_cursor(cursor, sort):
+    """Sort key from a cursor issued for the same sort. Raises ValueError otherwise."""
+    if not cursor:
+        return None
+    from .risk_engine import check_sort_key
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        cursor_sort, key = payload['sort'], payload['key']
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if cursor_sort != sort:
+        raise ValueError(f'Cursor was issued for sort={cursor_sort}, not sort={sort}')
+    return check_sort_key(sort, key)
 
 
 @login_required
@@ -245,16 +208,82 @@ def at_risk_json(request):
     # Allow admin and counselor access
     if not (request.user.is_admin() or user_in_groups(request.user, ['counselor'])):
         return HttpResponseForbidden('Access denied. Admin or counselor role required.')
+    threshold = _threshold_param(request)
     try:
-        threshold = float(request.GET.get('attendance_threshold', '75'))
-    except ValueError:
-        threshold = 75.0
-    data = _evaluate_all_students(threshold)
+        sort, limit, offset, after = _page_params(request)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    from .risk_engine import get_risk_index
+    index = get_risk_index().with_threshold(threshold)
     # Optional filters
     sid = request.GET.get('student_id')
     if sid:
-        data = [d for d in data if d['student_id'] == sid]
-    return JsonResponse({'items': data})
+        risk = index.results.get(sid)
+        return JsonResponse({'items': [risk] if risk and risk['at_risk'] else []})
+    items, total, next_after = index.page(sort=sort, limit=limit, offset=offset, after=after)
+    return JsonResponse({'items': items, 'total': total, 'next_cursor': _encode_cursor(sort, next_after)})
+
+
+def _sse_event(event: str, payload: dict) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n".encode('utf-8')
+
+
+def _index_at_risk(items):
+    return {item['student_id']: item for item in items}
+
+
+def _at_risk_counts(indexed: dict):
+    """Counters shown next to the at-risk table."""
+    items = indexed.values()
+    return {
+        'total': len(indexed),
+        'low_attendance': sum(1 for i in items if any(r.startswith('Attendance') for r in i.get('reasons', []))),
+        'overdue_fees': sum(1 for i in items if i.get('overdue_fees')),
+        'failing_grades': sum(1 for i in items if i.get('failing_grades')),
+    }
+
+
+def _at_risk_delta(prev: dict, current: dict):
+    """Diff two {student_id: item} maps.
+    Returns {} when nothing changed, otherwise added items, removed ids and
+    per-student changed fields (only the fields that differ).
+    """
+    added = [item for sid, item in current.items() if sid not in prev]
+    removed = [sid for sid in prev if sid not in current]
+    changed = []
+    for sid, item in current.items():
+        old = prev.get(sid)
+        if old is None or old == item:
+            continue
+        fields = {k: v for k, v in item.items() if old.get(k) != v}
+        changed.append({'student_id': sid, **fields})
+    if not (added or removed or changed):
+        return {}
+    return {'added': added, 'removed': removed, 'changed': changed}
+
+
+@login_required
+def at_risk_threshold_sweep(request):
+    """Return at-risk counts for several attendance thresholds, e.g. ?thresholds=50,60,75,90.
+    Each count is a bisect over the sorted attendance array, so sweeping is cheap.
+    """
+    if not (request.user.is_admin() or user_in_groups(request.user, ['counselor'])):
+        return HttpResponseForbidden('Access denied. Admin or counselor role required.')
+    raw = request.GET.get('thresholds') or '50,60,70,75,80,90'
+    try:
+        thresholds = [float(t) for t in raw.split(',') if t.strip()][:50]
+    except ValueError:
+        return JsonResponse({'error': 'thresholds must be comma-separated numbers'}, status=400)
+    from .risk_engine import get_risk_index
+    index = get_risk_index()
+    return JsonResponse({'items': [
+        {
+            'attendance_threshold': t,
+            'below_threshold': len(index.attendance_below(t)),
+            'at_risk': index.at_risk_count_for(t),
+        }
+        for t in thresholds
+    ]})
 
 
 @login_required
@@ -263,17 +292,25 @@ def at_risk_stream(request):
     if not (request.user.is_admin() or user_in_groups(request.user, ['counselor'])):
         return HttpResponseForbidden('Access denied. Admin or counselor role required.')
     # SSE stream with periodic refresh
-    try:
-        threshold = float(request.GET.get('attendance_threshold', '75'))
-    except ValueError:
-        threshold = 75.0
+    threshold = _threshold_param(request)
 
     def event_stream():
+        # Full snapshot on connect, then only deltas so payload size tracks the amount of change
+        prev_items = _index_at_risk(_evaluate_all_students(threshold))
+        prev_counts = _at_risk_counts(prev_items)
+        yield _sse_event('at_risk', {'items': list(prev_items.values()), 'counts': prev_counts})
         for _ in range(120):  # ~10 minutes at 5s interval
-            payload = json.dumps({'items': _evaluate_all_students(threshold)})
-            yield f"event: at_risk\n".encode('utf-8')
-            yield f"data: {payload}\n\n".encode('utf-8')
             time.sleep(5)
+            items = _index_at_risk(_evaluate_all_students(threshold))
+            counts = _at_risk_counts(items)
+            delta = _at_risk_delta(prev_items, items)
+            changed_counts = {k: v for k, v in counts.items() if prev_counts.get(k) != v}
+            if delta or changed_counts:
+                yield _sse_event('at_risk_delta', {**delta, 'counts': changed_counts})
+            else:
+                # Comment line keeps the connection alive without re-sending data
+                yield b": keep-alive\n\n"
+            prev_items, prev_counts = items, counts
 
     response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
     response['Cache-Control'] = 'no-cache'
@@ -387,76 +424,29 @@ def _compute_exam_distribution(exam_docs, start, end):
 
 
 def _compute_at_risk_reasons(attendance_docs, fee_docs, exam_docs, start, end):
-    # Build student-wise flags
-    students = set([d.get('student_id') for d in attendance_docs if d.get('student_id')]) \
-        | set([d.get('student_id') for d in fee_docs if d.get('student_id')]) \
-        | set([d.get('student_id') for d in exam_docs if d.get('student_id')])
-
-    # Attendance percentage per student
-    per_student = {}
-    for d in attendance_docs:
-        if not _in_date_range(d.get('date'), start, end):
-            continue
-        sid = d.get('student_id')
-        if not sid:
-            continue
-        total, pres = per_student.get(sid, (0, 0))
-        pres += 1 if d.get('present') else 0
-        per_student[sid] = (total + 1, pres)
-
-    today = date.today().isoformat()
+    # Reduce date-filtered docs to per-student columns and score them with the shared rules
+    from .risk_engine import parse_risk_columns
+    from .risk_rules import get_risk_rules
+    rules = get_risk_rules()
+    _, attendance_percent, overdue_fees, min_exam_percent = parse_risk_columns(
+        [d for d in attendance_docs if _in_date_range(d.get('date'), start, end)],
+        [d for d in fee_docs if _in_date_range(d.get('due_date'), start, end)],
+        [d for d in exam_docs if _in_date_range(d.get('exam_date'), start, end)],
+    )
+    att_label = f"Attendance <{rules.attendance_threshold:g}%"
     reasons_count = {
-        'Attendance <75%': 0,
+        att_label: 0,
         'Overdue fees': 0,
         'Failing grades': 0,
     }
     at_risk = 0
-    for sid in students:
-        att_ok = True
-        overdue = False
-        failing = False
-        total, pres = per_student.get(sid, (0, 0))
-        if total > 0:
-            pct = pres * 100.0 / total
-            att_ok = pct >= 75.0
-        # fees
-        for f in fee_docs:
-            if f.get('student_id') != sid:
-                continue
-            if not _in_date_range(f.get('due_date'), start, end):
-                continue
-            status = (f.get('status') or 'pending').lower()
-            due = f.get('due_date')
-            if due and due < today and status != 'completed':
-                overdue = True
-                break
-        # exams
-        for e in exam_docs:
-            if e.get('student_id') != sid:
-                continue
-            if not _in_date_range(e.get('exam_date'), start, end):
-                continue
-            try:
-                score = float(e.get('score', 0))
-                total_e = float(e.get('total', 100) or 100)
-                pct_e = (score / total_e) * 100.0
-                if pct_e < 40.0:
-                    failing = True
-                    break
-            except Exception:
-                continue
-        # Count
-        any_risk = False
-        if not att_ok:
-            reasons_count['Attendance <75%'] += 1
-            any_risk = True
-        if overdue:
-            reasons_count['Overdue fees'] += 1
-            any_risk = True
-        if failing:
-            reasons_count['Failing grades'] += 1
-            any_risk = True
-        if any_risk:
+    for pct, overdue, min_exam in zip(attendance_percent, overdue_fees, min_exam_percent):
+        low_att = pct < rules.attendance_threshold
+        failing = rules.is_failing_percent(min_exam)
+        reasons_count[att_label] += low_att
+        reasons_count['Overdue fees'] += overdue
+        reasons_count['Failing grades'] += failing
+        if low_att or overdue or failing:
             at_risk += 1
     return {
         'reasons_count': reasons_count,
@@ -484,21 +474,11 @@ def _compute_hostel_status(hostel_docs, start, end):
     return counts
 
 
-def _month_key(iso_date: str | None) -> str | None:
-    if not iso_date:
-        return None
-    try:
-        return iso_date[:7]  # YYYY-MM
-    except Exception:
-        return None
-
-
-def _compute_risk_trend(attendance_docs, fee_docs, exam_docs, months: int = 6):
-    """Compute monthly risk level counts (Low/Medium/High) over the last N months using current Firestore data.
-    Heuristic per month mirrors _risk_score_and_level:
-    - Attendance computed from that month
-    - Overdue fees if due_date <= end of month and status != completed
-    - Failing grades if any exam in that month with <40%
+def _compute_risk_trend(attendance_docs, fee_docs, exam_docs, months: int = 6, use_rollups: bool = True):
+    """Compute monthly risk level counts (Low/Medium/High) over the last N months.
+    Months with a precomputed RiskRollup (see snapshot_risk command) are read from the
+    history store; only months without one are reconstructed from current Firestore data.
+    Both come from risk_engine.evaluate_month, so every month uses the same per-month figures.
     """
     from datetime import date
     # Build last N months keys in chronological order
@@ -513,74 +493,34 @@ def _compute_risk_trend(attendance_docs, fee_docs, exam_docs, months: int = 6):
             y -= 1
     keys = list(reversed(keys))
 
-    # Group docs per month
-    att_by_month = {k: [] for k in keys}
-    fee_by_month = {k: [] for k in keys}
-    exam_by_month = {k: [] for k in keys}
-    for d in attendance_docs:
-        mk = _month_key(d.get('date'))
-        if mk in att_by_month:
-            att_by_month[mk].append(d)
-    for d in fee_docs:
-        mk = _month_key(d.get('due_date'))
-        if mk in fee_by_month:
-            fee_by_month[mk].append(d)
-    for d in exam_docs:
-        mk = _month_key(d.get('exam_date'))
-        if mk in exam_by_month:
-            exam_by_month[mk].append(d)
-
-    trend = []
-    for mk in keys:
-        att_docs = att_by_month.get(mk, [])
-        fee_docs_m = fee_by_month.get(mk, [])
-        exam_docs_m = exam_by_month.get(mk, [])
-        # Student set for this month
-        students = set()
-        students |= {d.get('student_id') for d in att_docs if d.get('student_id')}
-        students |= {d.get('student_id') for d in fee_docs_m if d.get('student_id')}
-        students |= {d.get('student_id') for d in exam_docs_m if d.get('student_id')}
-        # Attendance aggregates
-        per_student = {}
-        for d in att_docs:
-            sid = d.get('student_id')
-            if not sid:
-                continue
-            total, pres = per_student.get(sid, (0, 0))
-            pres += 1 if d.get('present') else 0
-            per_student[sid] = (total + 1, pres)
-        # Fees overdue as of end of month
-        # Compare strings YYYY-MM-DD <= mk-31 by prefix
-        def is_overdue(f):
-            status = (f.get('status') or 'pending').lower()
-            due = f.get('due_date') or ''
-            return due[:7] <= mk and status != 'completed'
-        # Exams failing if any exam <40
-        def is_failing(e):
-            try:
-                score = float(e.get('score', 0))
-                total = float(e.get('total', 100) or 100)
-                return (score / total) * 100.0 < 40.0
-            except Exception:
-                return False
-        high = medium = low = 0
-        for sid in students:
-            total, pres = per_student.get(sid, (0, 0))
-            att_pct = (pres * 100.0 / total) if total > 0 else 100.0
-            overdue = any(is_overdue(f) for f in fee_docs_m if f.get('student_id') == sid)
-            failing = any(is_failing(e) for e in exam_docs_m if e.get('student_id') == sid)
-            score, level = _risk_score_and_level(att_pct, overdue, failing)
-            if level == 'High':
-                high += 1
-            elif level == 'Medium':
-                medium += 1
-            else:
-                low += 1
-        trend.append({'month': mk, 'high': high, 'medium': medium, 'low': low})
-    return trend
+    rollups = {}
+    if use_rollups:
+        try:
+            from .risk_history import rollup_trend
+            rollups = rollup_trend(keys)
+        except Exception as e:
+            logger.warning(f'Risk rollups unavailable, recomputing trend: {e}')
+    missing = [k for k in keys if k not in rollups]
+    if not missing:
+        return [rollups[k] for k in keys]
+
+    from .risk_engine import MONTH_FIELDS, evaluate_month, group_by_month
+    att_by_month = group_by_month(attendance_docs, MONTH_FIELDS['attendance'], missing)
+    fee_by_month = group_by_month(fee_docs, MONTH_FIELDS['fees'], missing)
+    exam_by_month = group_by_month(exam_docs, MONTH_FIELDS['exams'], missing)
+    computed = {}
+    for mk in missing:
+        levels = [r['risk_level'] for r in evaluate_month(att_by_month[mk], fee_by_month[mk], exam_by_month[mk]).values()]
+        computed[mk] = {
+            'month': mk,
+            'high': levels.count('High'),
+            'medium': levels.count('Medium'),
+            'low': levels.count('Low'),
+        }
+    return [rollups.get(mk) or computed[mk] for mk in keys]
 
 
-def _compute_analytics(start: str | None, end: str | None, student_id: str | None):
+def _compute_analytics(start: str | None, end: str | None, student_id: str | None, months: int = 6):
     # Pull docs using cached reads and start snapshot watchers to reduce reads
     from mini_erp.firebase_utils import get_all_documents_cached, start_snapshot_watch
     for col in ['attendance', 'fees', 'exams', 'leaves', 'hostel_requests']:
@@ -605,7 +545,8 @@ def _compute_analytics(start: str | None, end: str | None, student_id: str | Non
     leaves_status = _compute_leaves_status(leaves, start, end)
     hostel_status = _compute_hostel_status(hostel, start, end)
     risk = _compute_at_risk_reasons(attendance, fees, exams, start, end)
-    risk_trend = _compute_risk_trend(attendance, fees, exams, months=6)
+    # Rollups are institution-wide; a single student's trend is always recomputed
+    risk_trend = _compute_risk_trend(attendance, fees, exams, months=months, use_rollups=not student_id)
 
     return {
         'attendance_distribution': attendance_dist,
@@ -618,6 +559,13 @@ def _compute_analytics(start: str | None, end: str | None, student_id: str | Non
     }
 
 
+def _trend_months(request, default: int = 6):
+    try:
+        return max(1, min(int(request.GET.get('months', default)), 120))
+    except ValueError:
+        return default
+
+
 @login_required
 def analytics_json(request):
     # Allow admin and counselor access
@@ -626,7 +574,7 @@ def analytics_json(request):
     start = request.GET.get('from')
     end = request.GET.get('to')
     sid = request.GET.get('student_id')
-    data = _compute_analytics(start, end, sid)
+    data = _compute_analytics(start, end, sid, _trend_months(request))
     return JsonResponse({'analytics': data})
 
 
@@ -638,13 +586,21 @@ def analytics_stream(request):
     start = request.GET.get('from')
     end = request.GET.get('to')
     sid = request.GET.get('student_id')
+    months = _trend_months(request)
 
     def event_stream():
+        # Full analytics on connect, then only the top-level sections that changed
+        prev = _compute_analytics(start, end, sid, months)
+        yield _sse_event('analytics', {'analytics': prev})
         for _ in range(120):
-            payload = json.dumps({'analytics': _compute_analytics(start, end, sid)})
-            yield f"event: analytics\n".encode('utf-8')
-            yield f"data: {payload}\n\n".encode('utf-8')
             time.sleep(5)
+            current = _compute_analytics(start, end, sid, months)
+            changed = {k: v for k, v in current.items() if prev.get(k) != v}
+            if changed:
+                yield _sse_event('analytics_delta', {'changed': changed})
+            else:
+                yield b": keep-alive\n\n"
+            prev = current
 
     response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
     response['Cache-Control'] = 'no-cache'
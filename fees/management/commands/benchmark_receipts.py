@@ -0,0 +1,61 @@
+import io
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+
+from fees.pdf_generator import receipt_styles, render_receipt
+
+
+def _sample_payment(i):
+    return SimpleNamespace(
+        transaction_id=f'TXN{i:08d}',
+        student_id=f'STU{i % 5000:05d}',
+        student_name='Asha Verma',
+        student_email='asha.verma@example.com',
+        amount=1250.0,
+        payment_mode='upi',
+        fee_type='Tuition Fee',
+        status='completed',
+        notes='Second installment for the autumn semester' if i % 2 else '',
+        created_at=datetime(2025, 9, 1, 10, 30),
+        get_payment_mode_display=lambda: 'UPI',
+        get_status_display=lambda: 'Completed',
+    )
+
+
+class Command(BaseCommand):
+    help = 'Compare receipt rendering: platypus with per-call styles, platypus with cached styles, canvas fast path'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=200, help='Receipts rendered per variant')
+
+    def _run(self, count, fast, rebuild_styles=False):
+        total_bytes = 0
+        started = time.perf_counter()
+        for i in range(count):
+            if rebuild_styles:
+                receipt_styles.cache_clear()
+            buffer = io.BytesIO()
+            render_receipt(_sample_payment(i), buffer, fast=fast)
+            total_bytes += buffer.tell()
+        elapsed = time.perf_counter() - started
+        return elapsed / count * 1000, total_bytes / count
+
+    def handle(self, *args, **options):
+        count = options['count']
+        # Warm up imports and font metrics so the first variant is not penalised
+        render_receipt(_sample_payment(0), io.BytesIO(), fast=False)
+        render_receipt(_sample_payment(0), io.BytesIO(), fast=True)
+
+        variants = [
+            ('platypus, styles per call', False, True),
+            ('platypus, cached styles', False, False),
+            ('canvas fast path', True, False),
+        ]
+        results = [(name, *self._run(count, fast, rebuild)) for name, fast, rebuild in variants]
+        baseline = results[0][1]
+        self.stdout.write(f"{'variant':<28} {'ms/receipt':>11} {'KB/receipt':>11} {'speedup':>8}")
+        for name, ms, size in results:
+            self.stdout.write(f'{name:<28} {ms:>11.2f} {size / 1024:>11.1f} {baseline / ms:>7.1f}x')
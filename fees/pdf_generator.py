@@ -1,82 +1,92 @@
 """
 PDF generation utility for fee receipts using ReportLab
+
+One renderer serves both the download response and saving to disk. Paragraph
+styles and the table style never change, so they are built once per process
+instead of on every receipt. Receipts have a fixed layout, so besides the
+platypus (flowable) renderer there is a fast path that draws the same receipt
+directly on a canvas and skips flowable layout entirely; compare the two with
+the benchmark_receipts management command. The canvas path only handles
+receipts that fit on one page; longer ones (e.g. lengthy notes) fall back to
+platypus, which paginates.
 """
+from functools import lru_cache
 from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import inch
-from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
+from reportlab.lib.enums import TA_CENTER
 from django.conf import settings
 import os
 from datetime import datetime
 import io
 from django.http import HttpResponse
 
-def generate_fee_receipt_pdf(fee_payment):
-    """
-    Generate PDF receipt for fee payment
-    
-    Args:
-        fee_payment: FeePayment model instance
-    
-    Returns:
-        HttpResponse with PDF content
-    """
-    # Create a bytes buffer for the PDF
-    buffer = io.BytesIO()
-    
-    # Create the PDF document
-    doc = SimpleDocTemplate(buffer, pagesize=A4, 
-                          rightMargin=72, leftMargin=72,
-                          topMargin=72, bottomMargin=18)
-    
-    # Container for the 'Flowable' objects
-    elements = []
-    
-    # Define styles
+PAGE_SIZE = A4
+MARGIN = 72
+BOTTOM_MARGIN = 18
+COL_WIDTHS = (2 * inch, 4 * inch)
+# Index of the "Amount Paid" row in receipt_rows(), highlighted in both renderers
+AMOUNT_ROW = 10
+
+FOOTER_LINES = [
+    'Thank you for your payment!',
+    'This is a computer-generated receipt.',
+    'For queries, contact the accounts department.',
+]
+
+
+@lru_cache(maxsize=None)
+def receipt_styles():
+    """Paragraph and table styles shared by every platypus receipt."""
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.platypus import TableStyle
+
     styles = getSampleStyleSheet()
-    
-    # Custom styles
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        spaceAfter=30,
-        alignment=TA_CENTER,
-        textColor=colors.darkblue
-    )
-    
-    subtitle_style = ParagraphStyle(
-        'CustomSubtitle',
-        parent=styles['Heading2'],
-        fontSize=16,
-        spaceAfter=20,
-        alignment=TA_CENTER,
-        textColor=colors.grey
-    )
-    
-    header_style = ParagraphStyle(
-        'CustomHeader',
-        parent=styles['Normal'],
-        fontSize=12,
-        spaceAfter=6,
-        alignment=TA_LEFT,
-        textColor=colors.black
-    )
-    
-    # Title
-    title = Paragraph("Mini ERP System", title_style)
-    elements.append(title)
-    
-    subtitle = Paragraph("Fee Payment Receipt", subtitle_style)
-    elements.append(subtitle)
-    
-    # Add space
-    elements.append(Spacer(1, 20))
-    
-    # Receipt details table
-    receipt_data = [
+    return {
+        'title': ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=24,
+            spaceAfter=30,
+            alignment=TA_CENTER,
+            textColor=colors.darkblue
+        ),
+        'subtitle': ParagraphStyle(
+            'CustomSubtitle',
+            parent=styles['Heading2'],
+            fontSize=16,
+            spaceAfter=20,
+            alignment=TA_CENTER,
+            textColor=colors.grey
+        ),
+        'footer': ParagraphStyle(
+            'Footer',
+            parent=styles['Normal'],
+            fontSize=10,
+            alignment=TA_CENTER,
+            textColor=colors.grey
+        ),
+        'table': TableStyle([
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+            ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 0), (-1, -1), 11),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+            ('TOPPADDING', (0, 0), (-1, -1), 8),
+
+            # Highlight amount row
+            ('BACKGROUND', (0, AMOUNT_ROW), (-1, AMOUNT_ROW), colors.lightgrey),
+            ('FONTNAME', (0, AMOUNT_ROW), (-1, AMOUNT_ROW), 'Helvetica-Bold'),
+
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ]),
+    }
+
+
+def receipt_rows(fee_payment):
+    """Label/value rows of the receipt table."""
+    rows = [
         ['Receipt No:', fee_payment.transaction_id],
         ['Date:', fee_payment.created_at.strftime('%B %d, %Y')],
         ['Time:', fee_payment.created_at.strftime('%I:%M %p')],
@@ -90,189 +100,163 @@ def generate_fee_receipt_pdf(fee_payment):
         ['Amount Paid:', f"${fee_payment.amount:.2f}"],
         ['Status:', fee_payment.get_status_display()],
     ]
-    
     if fee_payment.notes:
-        receipt_data.append(['', ''])
-        receipt_data.append(['Notes:', fee_payment.notes])
-    
-    # Create table
-    receipt_table = Table(receipt_data, colWidths=[2*inch, 4*inch])
-    receipt_table.setStyle(TableStyle([
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 11),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-        ('TOPPADDING', (0, 0), (-1, -1), 8),
-        
-        # Highlight amount row
-        ('BACKGROUND', (0, 10), (-1, 10), colors.lightgrey),
-        ('FONTNAME', (0, 10), (-1, 10), 'Helvetica-Bold'),
-        
-        # Add borders to non-empty rows
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-    ]))
-    
-    elements.append(receipt_table)
-    
-    # Add space
-    elements.append(Spacer(1, 30))
-    
-    # Footer
-    footer_style = ParagraphStyle(
-        'Footer',
-        parent=styles['Normal'],
-        fontSize=10,
-        alignment=TA_CENTER,
-        textColor=colors.grey
-    )
-    
+        rows.append(['', ''])
+        rows.append(['Notes:', fee_payment.notes])
+    return rows
+
+
+def _generated_on():
+    return f"Generated on: {datetime.now().strftime('%B %d, %Y at %I:%M %p')}"
+
+
+def _render_platypus(fee_payment, output):
+    from reportlab.platypus import SimpleDocTemplate, Table, Paragraph, Spacer
+
+    styles = receipt_styles()
+    doc = SimpleDocTemplate(output, pagesize=PAGE_SIZE,
+                            rightMargin=MARGIN, leftMargin=MARGIN,
+                            topMargin=MARGIN, bottomMargin=BOTTOM_MARGIN)
+    receipt_table = Table(receipt_rows(fee_payment), colWidths=COL_WIDTHS)
+    receipt_table.setStyle(styles['table'])
     footer_text = f"""
     <para align=center>
-    <b>Thank you for your payment!</b><br/>
-    This is a computer-generated receipt.<br/>
-    For queries, contact the accounts department.<br/><br/>
-    Generated on: {datetime.now().strftime('%B %d, %Y at %I:%M %p')}
+    <b>{FOOTER_LINES[0]}</b><br/>
+    {FOOTER_LINES[1]}<br/>
+    {FOOTER_LINES[2]}<br/><br/>
+    {_generated_on()}
     </para>
     """
-    
-    footer = Paragraph(footer_text, footer_style)
-    elements.append(footer)
-    
-    # Build the PDF
-    doc.build(elements)
-    
-    # Get the PDF content
-    pdf_content = buffer.getvalue()
-    buffer.close()
-    
-    # Create HTTP response
-    response = HttpResponse(content_type='application/pdf')
+    doc.build([
+        Paragraph("Mini ERP System", styles['title']),
+        Paragraph("Fee Payment Receipt", styles['subtitle']),
+        Spacer(1, 20),
+        receipt_table,
+        Spacer(1, 30),
+        Paragraph(footer_text, styles['footer']),
+    ])
+
+
+def _render_canvas(fee_payment, output):
+    """Draw the receipt with canvas primitives at fixed positions (no flowable layout).
+    Returns False without writing anything when the receipt does not fit on one page.
+    """
+    from reportlab.lib.utils import simpleSplit
+    from reportlab.pdfgen import canvas
+
+    width, height = PAGE_SIZE
+    value_width = COL_WIDTHS[1] - 12
+    font_size, padding, leading = 11, 8, 13.2
+    rows = [
+        (label, simpleSplit(str(value), 'Helvetica', font_size, value_width) or [''])
+        for label, value in receipt_rows(fee_payment)
+    ]
+    y = height - MARGIN - 24
+    table_top = y - (24 + 30) - (20 + 20 + 10)
+    table_height = sum(padding * 2 + leading * len(lines) for _, lines in rows)
+    # Footer: gap, bold line, then the remaining lines, a blank line and the timestamp
+    footer_height = 30 + 12 + 12 * (len(FOOTER_LINES) + 1)
+    if table_top - table_height - footer_height < BOTTOM_MARGIN:
+        return False
+
+    c = canvas.Canvas(output, pagesize=PAGE_SIZE)
+    center = width / 2
+
+    c.setFillColor(colors.darkblue)
+    c.setFont('Helvetica-Bold', 24)
+    c.drawCentredString(center, y, 'Mini ERP System')
+    y -= 24 + 30
+    c.setFillColor(colors.grey)
+    c.setFont('Helvetica-Bold', 16)
+    c.drawCentredString(center, y, 'Fee Payment Receipt')
+    y -= 20 + 20 + 10
+
+    # Table: same column widths, padding and font size as the platypus version
+    left = (width - sum(COL_WIDTHS)) / 2
+    c.setStrokeColor(colors.grey)
+    c.setLineWidth(0.5)
+    for index, (label, lines) in enumerate(rows):
+        row_height = padding * 2 + leading * len(lines)
+        bottom = y - row_height
+        if index == AMOUNT_ROW:
+            c.setFillColor(colors.lightgrey)
+            c.rect(left, bottom, sum(COL_WIDTHS), row_height, stroke=0, fill=1)
+        c.rect(left, bottom, COL_WIDTHS[0], row_height, stroke=1, fill=0)
+        c.rect(left + COL_WIDTHS[0], bottom, COL_WIDTHS[1], row_height, stroke=1, fill=0)
+        c.setFillColor(colors.black)
+        c.setFont('Helvetica-Bold', font_size)
+        text_y = y - padding - font_size
+        c.drawString(left + 6, text_y, label)
+        c.setFont('Helvetica-Bold' if index == AMOUNT_ROW else 'Helvetica', font_size)
+        for line in lines:
+            c.drawString(left + COL_WIDTHS[0] + 6, text_y, line)
+            text_y -= leading
+        y = bottom
+
+    y -= 30 + 12
+    c.setFillColor(colors.grey)
+    c.setFont('Helvetica-Bold', 10)
+    c.drawCentredString(center, y, FOOTER_LINES[0])
+    c.setFont('Helvetica', 10)
+    for line in FOOTER_LINES[1:] + ['', _generated_on()]:
+        y -= 12
+        if line:
+            c.drawCentredString(center, y, line)
+    c.showPage()
+    c.save()
+    return True
+
+
+def render_receipt(fee_payment, output, fast=None):
+    """
+    Render a fee receipt PDF
+
+    Args:
+        fee_payment: FeePayment model instance (or any object with the same fields)
+        output: File path or binary stream to write to
+        fast: Draw directly on a canvas instead of laying out flowables
+            (defaults to settings.RECEIPT_PDF_FAST); receipts longer than
+            one page still use the flowable layout
+    """
+    if fast is None:
+        fast = getattr(settings, 'RECEIPT_PDF_FAST', False)
+    if not (fast and _render_canvas(fee_payment, output)):
+        _render_platypus(fee_payment, output)
+    return output
+
+
+def generate_fee_receipt_pdf(fee_payment, fast=None):
+    """
+    Generate PDF receipt for fee payment
+
+    Args:
+        fee_payment: FeePayment model instance
+
+    Returns:
+        HttpResponse with PDF content
+    """
+    buffer = io.BytesIO()
+    render_receipt(fee_payment, buffer, fast=fast)
+    response = HttpResponse(buffer.getvalue(), content_type='application/pdf')
     response['Content-Disposition'] = f'attachment; filename="receipt_{fee_payment.transaction_id}.pdf"'
-    response.write(pdf_content)
-    
     return response
 
-def save_receipt_pdf(fee_payment, save_path=None):
+
+def save_receipt_pdf(fee_payment, save_path=None, fast=None):
     """
     Save fee receipt PDF to file system
-    
+
     Args:
         fee_payment: FeePayment model instance
         save_path: Optional custom save path
-    
+
     Returns:
         str: File path where PDF was saved
     """
     if save_path is None:
         save_path = os.path.join(settings.MEDIA_ROOT, 'receipts', f'receipt_{fee_payment.transaction_id}.pdf')
-    
+
     # Ensure directory exists
     os.makedirs(os.path.dirname(save_path), exist_ok=True)
-    
-    # Create a file buffer for the PDF
-    doc = SimpleDocTemplate(save_path, pagesize=A4, 
-                          rightMargin=72, leftMargin=72,
-                          topMargin=72, bottomMargin=18)
-    
-    # Container for the 'Flowable' objects
-    elements = []
-    
-    # Define styles
-    styles = getSampleStyleSheet()
-    
-    # Custom styles (same as above)
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        spaceAfter=30,
-        alignment=TA_CENTER,
-        textColor=colors.darkblue
-    )
-    
-    subtitle_style = ParagraphStyle(
-        'CustomSubtitle',
-        parent=styles['Heading2'],
-        fontSize=16,
-        spaceAfter=20,
-        alignment=TA_CENTER,
-        textColor=colors.grey
-    )
-    
-    # Title
-    title = Paragraph("Mini ERP System", title_style)
-    elements.append(title)
-    
-    subtitle = Paragraph("Fee Payment Receipt", subtitle_style)
-    elements.append(subtitle)
-    
-    # Add space
-    elements.append(Spacer(1, 20))
-    
-    # Receipt details table (same as above)
-    receipt_data = [
-        ['Receipt No:', fee_payment.transaction_id],
-        ['Date:', fee_payment.created_at.strftime('%B %d, %Y')],
-        ['Time:', fee_payment.created_at.strftime('%I:%M %p')],
-        ['', ''],
-        ['Student ID:', fee_payment.student_id],
-        ['Student Name:', fee_payment.student_name],
-        ['Student Email:', fee_payment.student_email],
-        ['', ''],
-        ['Fee Type:', fee_payment.fee_type],
-        ['Payment Mode:', fee_payment.get_payment_mode_display()],
-        ['Amount Paid:', f"${fee_payment.amount:.2f}"],
-        ['Status:', fee_payment.get_status_display()],
-    ]
-    
-    if fee_payment.notes:
-        receipt_data.append(['', ''])
-        receipt_data.append(['Notes:', fee_payment.notes])
-    
-    # Create table
-    receipt_table = Table(receipt_data, colWidths=[2*inch, 4*inch])
-    receipt_table.setStyle(TableStyle([
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 11),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-        ('TOPPADDING', (0, 0), (-1, -1), 8),
-        ('BACKGROUND', (0, 10), (-1, 10), colors.lightgrey),
-        ('FONTNAME', (0, 10), (-1, 10), 'Helvetica-Bold'),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-    ]))
-    
-    elements.append(receipt_table)
-    
-    # Add space
-    elements.append(Spacer(1, 30))
-    
-    # Footer
-    footer_style = ParagraphStyle(
-        'Footer',
-        parent=styles['Normal'],
-        fontSize=10,
-        alignment=TA_CENTER,
-        textColor=colors.grey
-    )
-    
-    footer_text = f"""
-    <para align=center>
-    <b>Thank you for your payment!</b><br/>
-    This is a computer-generated receipt.<br/>
-    For queries, contact the accounts department.<br/><br/>
-    Generated on: {datetime.now().strftime('%B %d, %Y at %I:%M %p')}
-    </para>
-    """
-    
-    footer = Paragraph(footer_text, footer_style)
-    elements.append(footer)
-    
-    # Build the PDF
-    doc.build(elements)
-    
+    render_receipt(fee_payment, save_path, fast=fast)
     return save_path
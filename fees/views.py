@@ -3,8 +3,8 @@ from django.contrib import messages
 from django.http import Http404
 from .forms import FeePaymentForm
 from .models import FeePayment
-from .pdf_generator import generate_fee_receipt_pdf, save_receipt_pdf
 from mini_erp.firebase_utils import add_document, get_all_documents, get_document
+from mini_erp.firestore_filters import normalize_document
 import logging
 
 logger = logging.getLogger(__name__)
@@ -31,7 +31,7 @@ def fee_payment(request):
                     'created_at': fee_payment.created_at.isoformat(),
                 }
                 
-                doc_id = add_document('fees', payment_data, fee_payment.transaction_id)
+                doc_id = add_document('fees', normalize_document('fees', payment_data), fee_payment.transaction_id)
                 
                 messages.success(request, f'Payment processed successfully! Transaction ID: {fee_payment.transaction_id}')
                 return redirect('fees:receipt', transaction_id=fee_payment.transaction_id)
@@ -149,6 +149,8 @@ def download_receipt(request, transaction_id):
                     
             fee_payment = MockFeePayment(firestore_data)
         
+        # reportlab is only loaded when a receipt is actually rendered
+        from .pdf_generator import generate_fee_receipt_pdf
         return generate_fee_receipt_pdf(fee_payment)
         
     except Exception as e:
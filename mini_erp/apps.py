@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class MiniErpConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'mini_erp'
+
+    def ready(self):
+        from .auth import connect_signals
+        connect_signals()
@@ -1,14 +1,37 @@
+import hashlib
 from functools import wraps
 from django.contrib.auth.decorators import login_required
+from django.core.cache import cache
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
 from django.http import HttpResponseForbidden
 
+# Admission email -> student_id memo. Only hits are cached: with the default per-process
+# cache, Admission signals invalidate just the worker that handled the write, so a cached
+# miss would hide a newly admitted student on the other workers until it expired.
+_STUDENT_ID_CACHE_PREFIX = 'student_id_for_email:'
+_STUDENT_ID_CACHE_TTL = 600
+
+
+def get_user_roles(user):
+    """Group names of the user, loaded once and memoized on the user object.
+    request.user is a single object for the whole request, so role_required,
+    user_in_groups and the has_group template filter share one query per request.
+    """
+    if not getattr(user, 'is_authenticated', False):
+        return frozenset()
+    roles = getattr(user, '_role_names', None)
+    if roles is None:
+        roles = frozenset(user.groups.values_list('name', flat=True))
+        user._role_names = roles
+    return roles
+
 
 def user_in_groups(user, groups):
     if not user.is_authenticated:
         return False
     if user.is_superuser:
         return True
-    user_groups = set(user.groups.values_list('name', flat=True))
+    user_groups = get_user_roles(user)
     return any(group in user_groups for group in groups)
 
 
@@ -23,3 +46,67 @@ def role_required(roles):
             return HttpResponseForbidden("You do not have permission to perform this action.")
         return _wrapped
     return decorator
+
+
+def _student_id_cache_key(email):
+    return _STUDENT_ID_CACHE_PREFIX + hashlib.sha1(email.encode('utf-8')).hexdigest()
+
+
+def get_student_id_for_user(user):
+    """Map a user to their student_id: user.student_id first, then the Admission with the same email.
+    Found ids are memoized per email in the cache (invalidated by Admission
+    saves/deletes); hits and misses alike are memoized per request on the user object.
+    """
+    try:
+        if not getattr(user, 'is_authenticated', False):
+            return None
+        sid = getattr(user, 'student_id', None)
+        if sid:
+            return sid
+        if hasattr(user, '_resolved_student_id'):
+            return user._resolved_student_id
+        email = getattr(user, 'email', '') or ''
+        sid = None
+        if email:
+            key = _student_id_cache_key(email)
+            sid = cache.get(key)
+            if sid is None:
+                from admissions.models import Admission
+                sid = Admission.objects.filter(email=email).values_list('student_id', flat=True).first()
+                if sid:
+                    cache.set(key, sid, _STUDENT_ID_CACHE_TTL)
+            sid = sid or None
+        user._resolved_student_id = sid
+        return sid
+    except Exception:
+        return None
+
+
+def _forget_admission_email(sender, instance, **kwargs):
+    if instance.email:
+        cache.delete(_student_id_cache_key(instance.email))
+
+
+def _forget_previous_admission_email(sender, instance, **kwargs):
+    if instance.pk:
+        old = sender.objects.filter(pk=instance.pk).values_list('email', flat=True).first()
+        if old and old != instance.email:
+            cache.delete(_student_id_cache_key(old))
+
+
+def _forget_user_roles(sender, instance, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear') and hasattr(instance, '_role_names'):
+        del instance._role_names
+
+
+def connect_signals():
+    """Wire cache invalidation for the student_id and role memos (called from MiniErpConfig.ready)."""
+    from django.contrib.auth import get_user_model
+    pre_save.connect(_forget_previous_admission_email, sender='admissions.Admission',
+                     dispatch_uid='mini_erp.auth.forget_previous_admission_email')
+    post_save.connect(_forget_admission_email, sender='admissions.Admission',
+                      dispatch_uid='mini_erp.auth.forget_admission_email_save')
+    post_delete.connect(_forget_admission_email, sender='admissions.Admission',
+                        dispatch_uid='mini_erp.auth.forget_admission_email_delete')
+    m2m_changed.connect(_forget_user_roles, sender=get_user_model().groups.through,
+                        dispatch_uid='mini_erp.auth.forget_user_roles')
@@ -0,0 +1,56 @@
+"""
+ETag / If-None-Match support for polled JSON endpoints.
+
+The ETag is a hash of the request (path, query, user) and the content digests
+of the data sources the view reads, so it can be computed without building the
+response. When the client's If-None-Match matches, Django's condition()
+decorator answers 304 Not Modified and the view body never runs. Responses are
+marked "private, no-cache" so browsers revalidate on every poll instead of
+re-downloading.
+"""
+import hashlib
+from functools import wraps
+
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from .firebase_utils import current_collection_digest
+
+
+def collection_etag(*collections, ttl_seconds=15, extra=None):
+    """Build an etag_func for views that read the given Firestore collections through the cache.
+    extra(request) may return additional state (e.g. a model timestamp) to mix in.
+    The value is memoized on the request, so a view can call the same func again
+    (e.g. to embed the version in its body) without recomputing the digests.
+    """
+    def etag_func(request, *args, **kwargs):
+        memo = request.__dict__.setdefault('_collection_etags', {})
+        if etag_func in memo:
+            return memo[etag_func]
+        etag = None
+        if request.method in ('GET', 'HEAD'):
+            parts = [request.path, request.GET.urlencode(), str(request.user.pk)]
+            for name in collections:
+                # Refresh the cache if stale so the digest reflects what the view will serve
+                parts.append(f"{name}:{current_collection_digest(name, ttl_seconds)}")
+            if extra is not None:
+                parts.append(str(extra(request)))
+            etag = hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()
+        memo[etag_func] = etag
+        return etag
+    return etag_func
+
+
+def etag_condition(etag_func):
+    """condition(etag_func=...) plus Cache-Control: private, no-cache on GET responses."""
+    def decorator(view_func):
+        conditional_view = condition(etag_func=etag_func)(view_func)
+
+        @wraps(view_func)
+        def _wrapped(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if request.method in ('GET', 'HEAD'):
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return _wrapped
+    return decorator
@@ -8,6 +8,7 @@ import os
 import logging
 import time
 import threading
+import hashlib
 
 logger = logging.getLogger(__name__)
 
@@ -18,9 +19,13 @@ _firestore_client = None
 # Simple in-process cache for collection reads
 _collection_cache = {}
 _cache_lock = threading.Lock()
+# Bumped every time a collection's cached data is replaced
+_collection_versions = {}
 
 # Optional background snapshot listeners (best-effort)
 _watchers_started = set()
+# Collections whose watch has delivered at least one snapshot
+_watchers_synced = set()
 
 
 def initialize_firebase():
@@ -55,12 +60,81 @@ def get_firestore_client():
     return _firestore_client
 
 
-def _update_cache(collection_name: str, data: list):
+def _read_snapshots(snapshots):
+    """Turn document snapshots into dicts (with id), hashing only their change metadata.
+    Returns (documents, digest); the digest covers each document's id and update_time,
+    so it changes whenever any document is added, updated or deleted without
+    serializing the document contents.
+    """
+    stamps = hashlib.blake2b(digest_size=16)
+    result = []
+    for doc in snapshots:
+        doc_data = doc.to_dict()
+        doc_data['id'] = doc.id
+        result.append(doc_data)
+        stamps.update(f"{doc.id}@{getattr(doc, 'update_time', '')}\n".encode('utf-8'))
+    return result, stamps.hexdigest()
+
+
+def _update_cache(collection_name: str, data: list, digest: str):
     with _cache_lock:
+        previous = _collection_cache.get(collection_name)
         _collection_cache[collection_name] = {
             'data': data,
             'ts': time.time(),
+            'digest': digest,
         }
+        # Refreshes that return unchanged documents keep the version
+        if previous is None or previous.get('digest') != digest:
+            _collection_versions[collection_name] = _collection_versions.get(collection_name, 0) + 1
+
+
+def _touch_cache(collection_name: str) -> bool:
+    """Mark the cached entry as fresh without replacing it. Returns False if nothing is cached."""
+    with _cache_lock:
+        entry = _collection_cache.get(collection_name)
+        if entry is None:
+            return False
+        entry['ts'] = time.time()
+        return True
+
+
+def get_collection_version(collection_name: str) -> int:
+    """Return a counter that changes whenever the cached data for a collection changes.
+    Useful as a cheap cache key for values derived from get_all_documents_cached().
+    """
+    with _cache_lock:
+        return _collection_versions.get(collection_name, 0)
+
+
+def get_collection_digest(collection_name: str) -> str:
+    """Return a hash of the cached documents' ids and update times ('' if not cached).
+    Unlike get_collection_version() it is identical across processes holding the same data,
+    so it can be exposed to clients (e.g. in ETags).
+    """
+    with _cache_lock:
+        entry = _collection_cache.get(collection_name)
+        return entry.get('digest', '') if entry else ''
+
+
+def current_collection_digest(collection_name: str, ttl_seconds: int = 15) -> str:
+    """Content digest of a collection as of now: keeps a snapshot watch running and
+    refreshes the cache first if it is older than ttl_seconds.
+    """
+    start_snapshot_watch(collection_name)
+    get_all_documents_cached(collection_name, ttl_seconds=ttl_seconds)
+    return get_collection_digest(collection_name)
+
+
+def watched_collection_digest(collection_name: str) -> str:
+    """Digest of a collection kept current by its snapshot watch, without reading it.
+    Starts the watch if needed; returns '' until the watch has delivered its first
+    snapshot (or when no watch could be started).
+    """
+    start_snapshot_watch(collection_name)
+    if collection_name not in _watchers_synced:
+        return ''
+    return get_collection_digest(collection_name)
 
 
 def get_all_documents(collection_name):
@@ -78,22 +152,71 @@ def get_all_documents(collection_name):
         if db is None:
             return []
             
-        docs = db.collection(collection_name).stream()
-        result = []
-        
-        for doc in docs:
-            doc_data = doc.to_dict()
-            doc_data['id'] = doc.id
-            result.append(doc_data)
-        
+        result, digest = _read_snapshots(db.collection(collection_name).stream())
         # keep cache updated for bare reads as well
-        _update_cache(collection_name, result)
+        _update_cache(collection_name, result, digest)
         return result
     except Exception as e:
         logger.error(f"Error getting documents from {collection_name}: {e}")
         return []
 
 
+def iter_documents(collection_name, filters=None, order_by=None, page_size=None):
+    """
+    Yield documents from a Firestore collection as the stream delivers them
+
+    Unlike get_all_documents() nothing is accumulated or cached, so callers
+    that encode rows incrementally keep memory flat.
+
+    Args:
+        collection_name (str): Name of the collection
+        filters (list, optional): (field, operator, value) tuples applied server-side
+        order_by (str, optional): Field to order by (documents missing it are skipped by Firestore)
+        page_size (int, optional): Read in pages of this many documents using query cursors
+            instead of one long-lived stream (for very large collections)
+
+    Yields:
+        dict: Document data with id field
+
+    Raises:
+        Errors from the stream are logged and re-raised, so a read that fails part-way
+        is never mistaken for a complete one (e.g. cached as a finished export)
+    """
+    db = get_firestore_client()
+    if db is None:
+        return
+    try:
+        query = db.collection(collection_name)
+        for field, operator, value in filters or []:
+            query = query.where(field, operator, value)
+        if order_by:
+            query = query.order_by(order_by)
+        if not page_size:
+            for doc in query.stream():
+                doc_data = doc.to_dict()
+                doc_data['id'] = doc.id
+                yield doc_data
+            return
+        if not order_by:
+            query = query.order_by('__name__')
+        last = None
+        while True:
+            page_query = query.limit(page_size)
+            if last is not None:
+                page_query = page_query.start_after(last)
+            page = list(page_query.stream())
+            for doc in page:
+                doc_data = doc.to_dict()
+                doc_data['id'] = doc.id
+                yield doc_data
+            if len(page) < page_size:
+                break
+            last = page[-1]
+    except Exception as e:
+        logger.error(f"Error streaming documents from {collection_name}: {e}")
+        raise
+
+
 def get_all_documents_cached(collection_name: str, ttl_seconds: int = 15) -> list:
     """Return collection documents using an in-process cache to reduce Firestore reads.
     If the cache is older than ttl_seconds, fetch from Firestore and refresh the cache.
@@ -121,12 +244,12 @@ def start_snapshot_watch(collection_name: str):
         col_ref = db.collection(collection_name)
         def on_snapshot(col_snapshot, changes, read_time):
             try:
-                result = []
-                for doc in col_snapshot:
-                    data = doc.to_dict()
-                    data['id'] = doc.id
-                    result.append(data)
-                _update_cache(collection_name, result)
+                # Snapshots without document changes leave the data (and its version) as is
+                if not changes and _touch_cache(collection_name):
+                    return
+                result, digest = _read_snapshots(col_snapshot)
+                _update_cache(collection_name, result, digest)
+                _watchers_synced.add(collection_name)
             except Exception as e:
                 logger.error(f"Snapshot update failed for {collection_name}: {e}")
         # Start listener in background thread managed by SDK
@@ -170,6 +293,45 @@ def add_document(collection_name, document_data, document_id=None):
         return None
 
 
+def add_documents_batch(collection_name, documents, batch_size=500, counter=None):
+    """
+    Add many documents using batched commits (one RPC per batch_size writes)
+    
+    Args:
+        collection_name (str): Name of the collection
+        documents (list): Dictionaries to store; Firestore generates the IDs
+        batch_size (int): Writes per commit (Firestore allows at most 500)
+        counter (tuple, optional): (collection, document_id, field, delta) incremented
+            in the final commit so the counter moves together with the last batch
+    
+    Returns:
+        list: Generated document IDs, empty on failure
+    """
+    try:
+        db = get_firestore_client()
+        if db is None:
+            return []
+        col_ref = db.collection(collection_name)
+        ids = []
+        # Leave room for the counter write in the final commit
+        step = batch_size - 1 if counter else batch_size
+        for i in range(0, len(documents), step):
+            batch = db.batch()
+            for data in documents[i:i + step]:
+                doc_ref = col_ref.document()
+                batch.set(doc_ref, data)
+                ids.append(doc_ref.id)
+            if counter and i + step >= len(documents):
+                c_col, c_id, c_field, delta = counter
+                batch.set(db.collection(c_col).document(c_id), {c_field: firestore.Increment(delta)}, merge=True)
+            batch.commit()
+        start_snapshot_watch(collection_name)
+        return ids
+    except Exception as e:
+        logger.error(f"Error batch adding documents to {collection_name}: {e}")
+        return []
+
+
 def get_document(collection_name, document_id):
     """
     Get a document from Firestore
@@ -279,6 +441,104 @@ def query_collection(collection_name, field, operator, value):
         return []
 
 
+def query_page(collection_name, order_by, descending=False, limit=50, start_after_id=None, filters=None):
+    """
+    Fetch one page of an ordered query (reads only `limit` documents)
+
+    Args:
+        collection_name (str): Name of the collection
+        order_by (str): Field to order by (needs an index when combined with filters)
+        descending (bool): Order newest/largest first
+        limit (int): Maximum number of documents to return
+        start_after_id (str, optional): ID of the last document of the previous page
+        filters (list, optional): (field, operator, value) tuples
+
+    Returns:
+        list: Matching documents with id field
+    """
+    try:
+        db = get_firestore_client()
+        if db is None:
+            return []
+        col_ref = db.collection(collection_name)
+        query = col_ref
+        for field, operator, value in filters or []:
+            query = query.where(field, operator, value)
+        direction = firestore.Query.DESCENDING if descending else firestore.Query.ASCENDING
+        query = query.order_by(order_by, direction=direction)
+        if start_after_id:
+            cursor = col_ref.document(start_after_id).get()
+            if not cursor.exists:
+                return []
+            query = query.start_after(cursor)
+        result = []
+        for doc in query.limit(limit).stream():
+            doc_data = doc.to_dict()
+            doc_data['id'] = doc.id
+            result.append(doc_data)
+        return result
+    except Exception as e:
+        logger.error(f"Error paging collection {collection_name}: {e}")
+        return []
+
+
+def update_documents_batch(collection_name, updates, batch_size=500, counter=None):
+    """
+    Apply many document updates using batched commits
+
+    Args:
+        collection_name (str): Name of the collection
+        updates (dict): Document ID -> fields to update
+        batch_size (int): Writes per commit (Firestore allows at most 500)
+        counter (tuple, optional): (collection, document_id, field, delta) incremented
+            in the final commit so the counter moves together with the last batch
+
+    Returns:
+        int: Number of documents updated
+    """
+    try:
+        db = get_firestore_client()
+        if db is None:
+            return 0
+        col_ref = db.collection(collection_name)
+        items = list(updates.items())
+        done = 0
+        for i in range(0, max(len(items), 1), batch_size):
+            batch = db.batch()
+            chunk = items[i:i + batch_size]
+            for doc_id, data in chunk:
+                batch.update(col_ref.document(doc_id), data)
+            if counter and i + batch_size >= len(items):
+                c_col, c_id, c_field, delta = counter
+                batch.set(db.collection(c_col).document(c_id), {c_field: firestore.Increment(delta)}, merge=True)
+            batch.commit()
+            done += len(chunk)
+        start_snapshot_watch(collection_name)
+        return done
+    except Exception as e:
+        logger.error(f"Error batch updating documents in {collection_name}: {e}")
+        return 0
+
+
+def increment_field(collection_name, document_id, field, delta=1):
+    """
+    Atomically add delta to a numeric field, creating the document if needed
+
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    try:
+        db = get_firestore_client()
+        if db is None:
+            return False
+        db.collection(collection_name).document(document_id).set(
+            {field: firestore.Increment(delta)}, merge=True)
+        return True
+    except Exception as e:
+        logger.error(f"Error incrementing {collection_name}/{document_id}.{field}: {e}")
+        return False
+
+
 def get_collection_count(collection_name):
     """
     Get the count of documents in a collection
@@ -296,3 +556,28 @@ def get_collection_count(collection_name):
     except Exception as e:
         logger.error(f"Error counting documents in {collection_name}: {e}")
         return 0
+
+
+def count_documents(collection_name, filters=None):
+    """
+    Count documents with a server-side aggregation query (no documents are read)
+
+    Args:
+        collection_name (str): Name of the collection
+        filters (list): Optional [(field, operator, value), ...] where clauses
+
+    Returns:
+        int: Number of matching documents, or 0 on error
+    """
+    db = get_firestore_client()
+    if db is None:
+        return 0
+    try:
+        query = db.collection(collection_name)
+        for field, op, value in filters or []:
+            query = query.where(field, op, value)
+        result = query.count().get()
+        return int(result[0][0].value)
+    except Exception as e:
+        logger.error(f"Error counting documents in {collection_name}: {e}")
+        return 0
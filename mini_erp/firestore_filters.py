@@ -0,0 +1,96 @@
+"""
+Compile request filter params into Firestore where clauses.
+
+Each collection declares which params it accepts and how they map onto stored
+fields. Equality filters on free-text values (status, subject) target a
+lowercased copy of the field kept up to date by normalize_document(), so the
+case-insensitive matching the API always offered is served by an index instead
+of a full-collection scan. required_indexes() derives the composite indexes
+for every filter combination; firestore.indexes.json is generated from it by
+the firestore_indexes management command.
+"""
+from itertools import combinations
+
+# param -> (stored field, operator, normalizer)
+FILTER_SPECS = {
+    'attendance': {
+        'student_id': ('student_id', '==', None),
+        'from': ('date', '>=', None),
+        'to': ('date', '<=', None),
+    },
+    'fees': {
+        'student_id': ('student_id', '==', None),
+        'status': ('status_lc', '==', str.lower),
+        'from': ('due_date', '>=', None),
+        'to': ('due_date', '<=', None),
+    },
+    'exams': {
+        'student_id': ('student_id', '==', None),
+        'subject': ('subject_lc', '==', str.lower),
+    },
+}
+
+# Stored field -> lowercased copy maintained on every write
+NORMALIZED_FIELDS = {
+    'fees': {'status': 'status_lc'},
+    'exams': {'subject': 'subject_lc'},
+}
+
+# Indexes needed by queries outside the filter specs
+EXTRA_INDEXES = [
+    {
+        'collectionGroup': 'notifications',
+        'queryScope': 'COLLECTION',
+        'fields': [
+            {'fieldPath': 'read', 'order': 'ASCENDING'},
+            {'fieldPath': 'created_at', 'order': 'DESCENDING'},
+        ],
+    },
+]
+
+
+def compile_filters(collection: str, params: dict) -> list:
+    """Return [(field, operator, value), ...] for the params this collection supports.
+    Empty or missing params are skipped.
+    """
+    clauses = []
+    for param, (field, op, normalize) in FILTER_SPECS.get(collection, {}).items():
+        value = params.get(param)
+        if value in (None, ''):
+            continue
+        clauses.append((field, op, normalize(value) if normalize else value))
+    return clauses
+
+
+def normalize_document(collection: str, data: dict) -> dict:
+    """Add the lowercased copies of normalized fields present in data (in place)."""
+    for field, normalized in NORMALIZED_FIELDS.get(collection, {}).items():
+        if field in data:
+            value = data[field]
+            data[normalized] = value.lower() if isinstance(value, str) else ''
+    return data
+
+
+def required_indexes() -> list:
+    """Composite indexes for every combination of equality filters plus at most one range field.
+    Queries that use only equality filters are served by Firestore's single-field
+    index merging and need no entry.
+    """
+    indexes = []
+    for collection, spec in FILTER_SPECS.items():
+        equality = sorted({field for field, op, _ in spec.values() if op == '=='})
+        ranges = sorted({field for field, op, _ in spec.values() if op != '=='})
+        for range_field in ranges:
+            for size in range(1, len(equality) + 1):
+                for fields in combinations(equality, size):
+                    indexes.append({
+                        'collectionGroup': collection,
+                        'queryScope': 'COLLECTION',
+                        'fields': [{'fieldPath': f, 'order': 'ASCENDING'} for f in fields + (range_field,)],
+                    })
+    return indexes + EXTRA_INDEXES
+
+
+def index_manifest() -> dict:
+    """Contents of firestore.indexes.json."""
+    return {'indexes': required_indexes(), 'fieldOverrides': []}
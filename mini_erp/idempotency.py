@@ -0,0 +1,112 @@
+"""
+Idempotency-Key support for write endpoints.
+
+Clients on flaky networks retry POSTs; without a key each retry creates
+another Firestore document and another risk evaluation. A view wrapped with
+@idempotent claims the key in the IdempotencyKey table before running, stores
+the response it produced, and answers replays of the same key with that stored
+response instead of executing again. Keys expire after IDEMPOTENCY_TTL_SECONDS.
+A claim whose request never finished (the worker was killed by the gunicorn
+timeout or the OOM killer) is treated as abandoned after
+IDEMPOTENCY_LEASE_SECONDS and taken over by the next retry.
+"""
+import hashlib
+import time
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+
+# Seconds between sweeps of expired keys (per process)
+_PURGE_INTERVAL = 3600
+_last_purge = 0.0
+
+
+def _ttl() -> timedelta:
+    return timedelta(seconds=getattr(settings, 'IDEMPOTENCY_TTL_SECONDS', 24 * 3600))
+
+
+def _lease() -> timedelta:
+    return timedelta(seconds=getattr(settings, 'IDEMPOTENCY_LEASE_SECONDS', 300))
+
+
+def _reclaim(record: IdempotencyKey) -> bool:
+    """Take over an in-flight claim older than the lease. Only one retry can win it."""
+    now = timezone.now()
+    if record.created_at >= now - _lease():
+        return False
+    return bool(IdempotencyKey.objects.filter(
+        scope=record.scope, status_code__isnull=True, created_at=record.created_at,
+    ).update(created_at=now))
+
+
+def _purge_expired():
+    global _last_purge
+    now = time.time()
+    if now - _last_purge < _PURGE_INTERVAL:
+        return
+    _last_purge = now
+    IdempotencyKey.objects.filter(created_at__lt=timezone.now() - _ttl()).delete()
+
+
+def _replay(record: IdempotencyKey) -> HttpResponse:
+    response = HttpResponse(bytes(record.body), status=record.status_code,
+                            content_type=record.content_type or 'application/json')
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(view_func):
+    """Honour an Idempotency-Key header on POST requests.
+    Place below the auth decorators so the key is scoped to the authenticated user.
+    """
+    @wraps(view_func)
+    def _wrapped(request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if request.method != 'POST' or not key:
+            return view_func(request, *args, **kwargs)
+        if len(key) > 255:
+            return JsonResponse({'error': f'{HEADER} must be at most 255 characters'}, status=400)
+
+        user_id = request.user.pk if request.user.is_authenticated else ''
+        scope = hashlib.sha256(f"{user_id}:{request.method}:{request.path}:{key}".encode('utf-8')).hexdigest()
+        request_hash = hashlib.sha256(request.body or b'').hexdigest()
+
+        _purge_expired()
+        IdempotencyKey.objects.filter(scope=scope, created_at__lt=timezone.now() - _ttl()).delete()
+        try:
+            IdempotencyKey.objects.create(scope=scope, request_hash=request_hash)
+        except IntegrityError:
+            record = IdempotencyKey.objects.filter(scope=scope).first()
+            if record is None:
+                return JsonResponse({'error': 'Idempotency key conflict, retry the request'}, status=409)
+            if record.request_hash != request_hash:
+                return JsonResponse({'error': f'{HEADER} was already used with a different request body'}, status=422)
+            if record.status_code is not None:
+                return _replay(record)
+            if not _reclaim(record):
+                return JsonResponse({'error': 'A request with this idempotency key is still in progress'}, status=409)
+
+        try:
+            response = view_func(request, *args, **kwargs)
+        except Exception:
+            IdempotencyKey.objects.filter(scope=scope).delete()
+            raise
+        # Server errors and streamed bodies are not stored, so the client may retry
+        if response.status_code >= 500 or getattr(response, 'streaming', False):
+            IdempotencyKey.objects.filter(scope=scope).delete()
+            return response
+        IdempotencyKey.objects.filter(scope=scope).update(
+            status_code=response.status_code,
+            content_type=response.get('Content-Type', ''),
+            body=response.content,
+        )
+        return response
+    return _wrapped
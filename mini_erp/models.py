@@ -0,0 +1,18 @@
+from django.db import models
+
+
+class IdempotencyKey(models.Model):
+    """Stored outcome of a write request made with an Idempotency-Key header.
+    scope hashes (user, method, path, key) so keys never collide across users or
+    endpoints; a row with status_code NULL is a request still in flight (or, once
+    older than IDEMPOTENCY_LEASE_SECONDS, an abandoned one that a retry may reclaim).
+    """
+    scope = models.CharField(max_length=64, primary_key=True)
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    content_type = models.CharField(max_length=100, blank=True, default='')
+    body = models.BinaryField(default=bytes)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.scope[:12]} ({self.status_code or 'pending'})"
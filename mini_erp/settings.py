@@ -166,6 +166,41 @@ EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', '')
 EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', 'true').lower() in ['1', 'true', 'yes']
 DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', EMAIL_HOST_USER or 'noreply@example.com')
 
+# Risk alert pipeline: identical (student, reasons) alerts are suppressed within the
+# dedupe window; the rest are flushed as batched notifications every ALERT_FLUSH_SECONDS
+ALERT_DEDUPE_WINDOW_SECONDS = int(os.getenv('ALERT_DEDUPE_WINDOW_SECONDS', str(6 * 3600)))
+ALERT_FLUSH_SECONDS = int(os.getenv('ALERT_FLUSH_SECONDS', '30'))
+ALERT_BATCH_SIZE = int(os.getenv('ALERT_BATCH_SIZE', '100'))
+# Bulk writes schedule one batched risk re-evaluation after this delay
+RISK_RECHECK_DELAY_SECONDS = int(os.getenv('RISK_RECHECK_DELAY_SECONDS', '2'))
+# Notifications older than this are moved to notifications_archive (manage.py archive_notifications)
+NOTIFICATION_TTL_DAYS = int(os.getenv('NOTIFICATION_TTL_DAYS', '90'))
+
+# Stored responses for Idempotency-Key replays expire after this long
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv('IDEMPOTENCY_TTL_SECONDS', str(24 * 3600)))
+# In-flight claims older than this belong to a killed worker and may be reclaimed (> GUNICORN_TIMEOUT)
+IDEMPOTENCY_LEASE_SECONDS = int(os.getenv('IDEMPOTENCY_LEASE_SECONDS', '300'))
+
+# Background export jobs: worker threads per process, how long a queued/running
+# job may take before it is failed, and how long finished artifacts are kept
+EXPORT_WORKERS = int(os.getenv('EXPORT_WORKERS', '2'))
+EXPORT_JOB_TIMEOUT_SECONDS = int(os.getenv('EXPORT_JOB_TIMEOUT_SECONDS', '3600'))
+EXPORT_JOB_TTL_SECONDS = int(os.getenv('EXPORT_JOB_TTL_SECONDS', str(24 * 3600)))
+# Size bound for cached export files in MEDIA_ROOT/exports/cache (0 disables the cache)
+EXPORT_CACHE_MAX_BYTES = int(os.getenv('EXPORT_CACHE_MAX_BYTES', str(512 * 1024 * 1024)))
+
+# Draw fee receipts directly on a canvas instead of the platypus layout (manage.py benchmark_receipts)
+RECEIPT_PDF_FAST = os.getenv('RECEIPT_PDF_FAST', 'false').lower() in ['1','true','yes']
+
+# Predictive risk rules (see dashboard/risk_rules.py for the full schema).
+# Keys set here override the defaults; RISK_RULES_PATH may point to a JSON file
+# with the same keys that is re-read whenever it changes.
+RISK_RULES = {
+    'attendance_threshold': float(os.getenv('RISK_ATTENDANCE_THRESHOLD', '75')),
+    'fail_grade_percent': float(os.getenv('RISK_FAIL_GRADE_PERCENT', '40')),
+}
+RISK_RULES_PATH = os.getenv('RISK_RULES_PATH')
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -0,0 +1,74 @@
+"""
+Incremental JSON encoding for large list endpoints.
+
+List views normally build every row in memory and serialize them with one
+JsonResponse. When the client asks for ?format=ndjson (one JSON object per
+line) or ?stream=1 (the usual {"items": [...]} body, sent in chunks), rows are
+pulled from a generator and encoded as they arrive, so the first bytes go out
+immediately and worker memory stays flat.
+"""
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+
+# Bytes buffered before a chunk is yielded to the WSGI server
+CHUNK_SIZE = 64 * 1024
+
+NDJSON_CONTENT_TYPE = 'application/x-ndjson'
+
+
+def stream_format(request):
+    """Return 'ndjson', 'json' or None (regular JsonResponse) for this request."""
+    fmt = (request.GET.get('format') or '').lower()
+    if fmt == 'ndjson' or NDJSON_CONTENT_TYPE in request.headers.get('Accept', ''):
+        return 'ndjson'
+    if request.GET.get('stream') in ['1', 'true', 'yes']:
+        return 'json'
+    return None
+
+
+def _encode_ndjson(rows, encoder):
+    for row in rows:
+        yield encoder.encode(row) + '\n'
+
+
+def _encode_array(rows, encoder):
+    yield '{"items": ['
+    first = True
+    for row in rows:
+        yield encoder.encode(row) if first else ',' + encoder.encode(row)
+        first = False
+    yield ']}'
+
+
+def chunked(parts):
+    """Join str parts into utf-8 chunks of about CHUNK_SIZE bytes."""
+    buf, size = [], 0
+    for part in parts:
+        buf.append(part)
+        size += len(part)
+        if size >= CHUNK_SIZE:
+            yield ''.join(buf).encode('utf-8')
+            buf, size = [], 0
+    if buf:
+        yield ''.join(buf).encode('utf-8')
+
+
+def streaming_json_response(rows, fmt='json'):
+    """Stream rows as NDJSON or as a chunked {"items": [...]} document."""
+    encoder = DjangoJSONEncoder()
+    if fmt == 'ndjson':
+        parts, content_type = _encode_ndjson(rows, encoder), NDJSON_CONTENT_TYPE
+    else:
+        parts, content_type = _encode_array(rows, encoder), 'application/json'
+    response = StreamingHttpResponse(chunked(parts), content_type=content_type)
+    # Stop reverse proxies from buffering the whole body
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def list_response(request, rows):
+    """JsonResponse-compatible helper: stream when requested, otherwise materialize."""
+    fmt = stream_format(request)
+    if fmt:
+        return streaming_json_response(rows, fmt)
+    return JsonResponse({'items': list(rows)})
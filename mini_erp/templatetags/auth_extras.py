@@ -1,10 +1,12 @@
 from django import template
 
+from mini_erp.auth import get_user_roles
+
 register = template.Library()
 
 @register.filter(name='has_group')
 def has_group(user, group_name: str):
     try:
-        return user.is_authenticated and (user.is_superuser or user.groups.filter(name=group_name).exists())
+        return user.is_authenticated and (user.is_superuser or group_name in get_user_roles(user))
     except Exception:
         return False
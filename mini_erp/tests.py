@@ -0,0 +1,68 @@
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from admissions.models import Admission
+from mini_erp.auth import get_student_id_for_user, get_user_roles, user_in_groups
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class AuthMemoTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin_group = Group.objects.create(name='admin')
+        self.teacher_group = Group.objects.create(name='teacher')
+        self.user = get_user_model().objects.create_user(
+            username='asha', email='asha@example.com', password='secret', role='Faculty',
+        )
+        self.user.groups.add(self.teacher_group)
+        Admission.objects.create(
+            student_id='STU00001', first_name='Asha', last_name='Verma', email='asha@example.com',
+            phone='9999999999', date_of_birth=date(2005, 1, 1), gender='F', address='-', course='BSc',
+        )
+        # Faculty users get no generated student_id, so lookups go through Admission.
+        # A fresh object, as request.user would be at the start of a request
+        self.user = get_user_model().objects.get(pk=self.user.pk)
+
+    def test_role_checks_query_groups_once_per_user_object(self):
+        with self.assertNumQueries(1):
+            for _ in range(5):
+                self.assertTrue(user_in_groups(self.user, ['admin', 'teacher']))
+                self.assertFalse(user_in_groups(self.user, ['admin']))
+                self.assertEqual(get_user_roles(self.user), frozenset({'teacher'}))
+
+    def test_student_id_lookup_is_memoized_per_request_and_in_cache(self):
+        with self.assertNumQueries(1):
+            for _ in range(5):
+                self.assertEqual(get_student_id_for_user(self.user), 'STU00001')
+
+        # A new request (new user object) hits the email cache, not the database
+        next_request_user = get_user_model().objects.get(pk=self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_student_id_for_user(next_request_user), 'STU00001')
+
+    def test_group_changes_clear_role_memo(self):
+        self.assertFalse(user_in_groups(self.user, ['admin']))
+        self.user.groups.add(self.admin_group)
+        self.assertFalse(hasattr(self.user, '_role_names'))
+        with self.assertNumQueries(1):
+            self.assertTrue(user_in_groups(self.user, ['admin']))
+            self.assertTrue(user_in_groups(self.user, ['admin']))
+
+        self.user.groups.remove(self.admin_group)
+        self.assertFalse(user_in_groups(self.user, ['admin']))
+
+    def test_missing_admission_is_not_cached_across_requests(self):
+        Admission.objects.filter(email='asha@example.com').delete()
+        with self.assertNumQueries(1):
+            self.assertIsNone(get_student_id_for_user(self.user))
+            self.assertIsNone(get_student_id_for_user(self.user))
+
+        next_request_user = get_user_model().objects.get(pk=self.user.pk)
+        with self.assertNumQueries(1):
+            self.assertIsNone(get_student_id_for_user(next_request_user))
@@ -10,7 +10,9 @@ from django.conf import settings
 import requests
 
 from mini_erp.firebase_utils import add_document, update_document, get_document
+from mini_erp.firestore_filters import normalize_document
 from mini_erp.auth import role_required
+from mini_erp.idempotency import idempotent
 
 
 CASHFREE_SANDBOX_BASE = "https://sandbox.cashfree.com/pg"
@@ -33,6 +35,7 @@ def _cashfree_headers():
 @csrf_exempt
 @role_required(['admin', 'accountant'])
 @require_http_methods(["POST"])
+@idempotent
 def cashfree_create_order(request):
     try:
         payload = json.loads(request.body.decode('utf-8'))
@@ -62,7 +65,7 @@ def cashfree_create_order(request):
         'created_at': datetime.utcnow().isoformat() + 'Z',
         'order_id': order_id,
     }
-    fee_doc_id = add_document('fees', fee_doc)
+    fee_doc_id = add_document('fees', normalize_document('fees', fee_doc))
 
     # Cashfree order creation
     create_url = f"{_cashfree_base()}/orders"
@@ -0,0 +1,261 @@
+"""
+Risk alert pipeline: dedupe, coalesce and batch-write notifications.
+
+Every attendance/fee/exam write for an at-risk student used to create a
+notification and send an email. queue_alert() instead drops alerts whose
+(student_id, reason categories) was already raised within
+ALERT_DEDUPE_WINDOW_SECONDS, merges the rest per student, and a background
+flush writes them as one batched Firestore commit plus one SMTP connection for
+the emails. Categories (low_attendance, overdue_fees, failing_grades) are used
+instead of the reason text because the attendance reason carries the current
+percentage, which changes on nearly every write.
+"""
+import atexit
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.core.mail import send_mass_mail
+from django.db import connection
+
+from mini_erp.firebase_utils import get_firestore_client, iter_documents
+
+from .inbox import NOTIFICATIONS, add_notifications
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+# (student_id, frozenset(categories)) -> time the alert was last raised
+_recent = {}
+# student_id -> {'reasons': [...], 'categories': [...], 'events': int}
+_pending = {}
+_timer = None
+_primed = False
+# Earliest time a failed priming is retried
+_prime_retry_at = 0.0
+# Seconds between priming attempts after a failure
+_PRIME_RETRY_SECONDS = 60
+# student_ids waiting for a batched risk re-evaluation
+_recheck = set()
+_recheck_timer = None
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def reason_categories(reasons) -> list:
+    """Stable categories for reason texts (used for notifications stored without them)."""
+    categories = []
+    if any(r.startswith('Attendance') for r in reasons):
+        categories.append('low_attendance')
+    if any(r.startswith('Overdue') for r in reasons):
+        categories.append('overdue_fees')
+    if any(r.startswith('Failing') for r in reasons):
+        categories.append('failing_grades')
+    return categories
+
+
+def risk_categories(risk: dict) -> list:
+    """Stable categories for a risk result, from its flags rather than its formatted reasons."""
+    categories = ['low_attendance'] if any(r.startswith('Attendance') for r in risk['reasons']) else []
+    if risk.get('overdue_fees'):
+        categories.append('overdue_fees')
+    if risk.get('failing_grades'):
+        categories.append('failing_grades')
+    return categories
+
+
+def _on_timer(func):
+    """Timer target running func; the thread's ORM connection is closed afterwards."""
+    def run():
+        try:
+            func()
+        finally:
+            connection.close()
+    return run
+
+
+def _schedule_flush():
+    """Start the flush timer if none is pending. Caller holds _lock."""
+    global _timer
+    if _timer is None:
+        _timer = threading.Timer(_setting('ALERT_FLUSH_SECONDS', 30), _on_timer(flush_alerts))
+        _timer.daemon = True
+        _timer.start()
+
+
+def _prime_recent():
+    """Seed the dedupe window from notifications already in Firestore.
+    Runs once per process once it succeeds; failures are retried after _PRIME_RETRY_SECONDS.
+    """
+    global _primed, _prime_retry_at
+    now = time.time()
+    if _primed or now < _prime_retry_at:
+        return
+    _prime_retry_at = now + _PRIME_RETRY_SECONDS
+    if get_firestore_client() is None:
+        return
+    window = _setting('ALERT_DEDUPE_WINDOW_SECONDS', 6 * 3600)
+    cutoff = (datetime.utcnow() - timedelta(seconds=window)).isoformat() + 'Z'
+    try:
+        docs = list(islice(iter_documents(NOTIFICATIONS, filters=[('created_at', '>=', cutoff)],
+                                          order_by='created_at'), 5000))
+    except Exception as e:
+        logger.warning(f'Could not prime alert dedupe window: {e}')
+        return
+    _primed = True
+    with _lock:
+        for doc in docs:
+            if doc.get('type') != 'risk_alert':
+                continue
+            categories = doc.get('categories') or reason_categories(doc.get('reasons') or [])
+            key = (doc.get('student_id'), frozenset(categories))
+            _recent.setdefault(key, now)
+
+
+def queue_alert(student_id: str, risk: dict) -> bool:
+    """Queue a risk alert for a risk result (evaluate_risk / risk engine row).
+    Returns False when it was suppressed as a duplicate.
+    """
+    reasons = risk.get('reasons') or []
+    if not student_id or not reasons:
+        return False
+    window = _setting('ALERT_DEDUPE_WINDOW_SECONDS', 6 * 3600)
+    categories = risk_categories(risk)
+    key = (student_id, frozenset(categories))
+    _prime_recent()
+    now = time.time()
+    with _lock:
+        if now - _recent.get(key, 0) < window:
+            return False
+        _recent[key] = now
+        if len(_recent) > 10000:
+            for k in [k for k, ts in _recent.items() if now - ts >= window]:
+                del _recent[k]
+        entry = _pending.setdefault(student_id, {'reasons': [], 'categories': [], 'events': 0})
+        entry['reasons'] = list(reasons)
+        entry['categories'] = categories
+        entry['events'] += 1
+        flush_now = len(_pending) >= _setting('ALERT_BATCH_SIZE', 100)
+        if not flush_now:
+            _schedule_flush()
+    if flush_now:
+        flush_alerts()
+    return True
+
+
+def _requeue(pending: dict):
+    """Put a batch that failed to flush back in front of anything queued since, and retry later."""
+    with _lock:
+        for sid, entry in pending.items():
+            newer = _pending.get(sid)
+            if newer is None:
+                _pending[sid] = entry
+            else:
+                newer['events'] += entry['events']
+        _schedule_flush()
+
+
+def flush_alerts() -> int:
+    """Write all pending alerts as digest notifications in batched commits. Returns the count.
+    Runs on a timer thread, so failures are logged and the batch is re-queued rather than raised.
+    """
+    global _pending, _timer
+    with _lock:
+        pending, _pending = _pending, {}
+        if _timer is not None:
+            _timer.cancel()
+            _timer = None
+    if not pending:
+        return 0
+    try:
+        return _write_alerts(pending)
+    except Exception:
+        logger.exception(f'Flushing {len(pending)} risk alert(s) failed; re-queued')
+        _requeue(pending)
+        return 0
+
+
+def _write_alerts(pending: dict) -> int:
+    from admissions.models import Admission
+    admissions = {a.student_id: a for a in Admission.objects.filter(student_id__in=list(pending))}
+    created_at = datetime.utcnow().isoformat() + 'Z'
+    notifications, emails = [], []
+    for sid, entry in pending.items():
+        adm = admissions.get(sid)
+        message = f"Student {sid} flagged: {', '.join(entry['reasons'])}"
+        notifications.append({
+            'student_id': sid,
+            'student_name': f"{adm.first_name} {adm.last_name}" if adm else '',
+            'type': 'risk_alert',
+            'message': message,
+            'reasons': entry['reasons'],
+            'categories': entry['categories'],
+            'events': entry['events'],
+            'created_at': created_at,
+            'read': False,
+        })
+        if adm and adm.email:
+            emails.append((f"Student {sid} at-risk alert", message, settings.DEFAULT_FROM_EMAIL, [adm.email]))
+
+    add_notifications(notifications)
+
+    # Email alerts (best-effort), all over a single SMTP connection
+    if emails and settings.EMAIL_HOST_USER and settings.EMAIL_HOST_PASSWORD:
+        try:
+            send_mass_mail(tuple(emails), fail_silently=True)
+        except Exception:
+            pass
+    return len(notifications)
+
+
+def schedule_risk_check(student_ids) -> None:
+    """Re-evaluate risk for these students once, shortly, in the background.
+    Calls within RISK_RECHECK_DELAY_SECONDS are coalesced into a single batch
+    evaluation over the cached collections instead of three queries per student.
+    """
+    global _recheck_timer
+    ids = {sid for sid in student_ids if sid}
+    if not ids:
+        return
+    with _lock:
+        _recheck.update(ids)
+        if _recheck_timer is None:
+            _recheck_timer = threading.Timer(_setting('RISK_RECHECK_DELAY_SECONDS', 2), _on_timer(run_risk_check))
+            _recheck_timer.daemon = True
+            _recheck_timer.start()
+
+
+def run_risk_check() -> int:
+    """Evaluate all scheduled students in one pass and queue alerts. Returns the number flagged."""
+    global _recheck, _recheck_timer
+    with _lock:
+        ids, _recheck = _recheck, set()
+        if _recheck_timer is not None:
+            _recheck_timer.cancel()
+            _recheck_timer = None
+    if not ids:
+        return 0
+    from dashboard.risk_engine import get_risk_index
+    try:
+        # The snapshot watches started by load_risk_collections (and by the writes that
+        # scheduled this check) keep the cached collections current; the recheck delay
+        # gives the watch time to deliver those writes, so no full re-read is needed.
+        results = get_risk_index().results
+    except Exception as e:
+        logger.error(f'Batched risk check failed: {e}')
+        return 0
+    flagged = 0
+    for sid in ids:
+        risk = results.get(sid)
+        if risk and risk['at_risk']:
+            queue_alert(sid, risk)
+            flagged += 1
+    return flagged
+
+
+atexit.register(flush_alerts)
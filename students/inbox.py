@@ -0,0 +1,227 @@
+"""
+Notifications inbox: newest-first pages, a maintained unread counter and archival.
+
+Listing a page reads only that page through an ordered Firestore query on
+created_at, and the unread total lives in a single counter document that every
+write path adjusts in the same commit as its writes (marking read re-checks the
+documents inside a transaction, so concurrent calls never decrement twice).
+The counter is seeded from a count query the first time it is found missing.
+Alert panel refreshes therefore cost the same no matter how many
+notifications have accumulated. Old notifications are moved to
+NOTIFICATIONS_ARCHIVE by archive_notifications() (see the archive_notifications
+management command).
+"""
+import logging
+import time
+import threading
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from firebase_admin import firestore
+
+from mini_erp.firebase_utils import (
+    add_documents_batch,
+    get_document,
+    get_firestore_client,
+    increment_field,
+    query_page,
+)
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATIONS = 'notifications'
+NOTIFICATIONS_ARCHIVE = 'notifications_archive'
+# counters/notifications holds {'unread': int}
+COUNTER = ('counters', 'notifications', 'unread')
+
+# Seconds the unread count is served from memory between counter reads
+_UNREAD_TTL = 5
+_unread_lock = threading.Lock()
+_unread_cache = {'value': None, 'ts': 0.0}
+_counter_seeded = False
+# Writes per transaction (Firestore allows 500; one is the counter)
+_MARK_CHUNK = 499
+
+
+def _set_unread_cache(value):
+    with _unread_lock:
+        _unread_cache['value'] = value
+        _unread_cache['ts'] = time.time() if value is not None else 0.0
+
+
+def _ensure_counter():
+    """Seed the counter from a count query if it does not exist yet (checked once per process).
+    Without this the first decrement on a database with existing notifications would
+    drive it negative. create() fails if another process seeded it first, which is fine.
+    """
+    global _counter_seeded
+    if _counter_seeded:
+        return
+    db = get_firestore_client()
+    if db is None:
+        return
+    try:
+        ref = db.collection(COUNTER[0]).document(COUNTER[1])
+        if not ref.get().exists:
+            result = db.collection(NOTIFICATIONS).where('read', '==', False).count().get()
+            try:
+                ref.create({COUNTER[2]: int(result[0][0].value)})
+            except Exception:
+                pass
+        _counter_seeded = True
+    except Exception as e:
+        logger.error(f"Error seeding unread notification counter: {e}")
+
+
+def _adjust_unread(delta: int):
+    if not delta:
+        return
+    _ensure_counter()
+    increment_field(*COUNTER, delta=delta)
+    _set_unread_cache(None)
+
+
+def unread_count() -> int:
+    """Unread notifications, read from the counter document (one read, briefly cached)."""
+    with _unread_lock:
+        if _unread_cache['value'] is not None and time.time() - _unread_cache['ts'] < _UNREAD_TTL:
+            return _unread_cache['value']
+    _ensure_counter()
+    doc = get_document(COUNTER[0], COUNTER[1]) or {}
+    value = max(int(doc.get(COUNTER[2], 0) or 0), 0)
+    _set_unread_cache(value)
+    return value
+
+
+def add_notifications(documents: list) -> list:
+    """Write notifications in batched commits, bumping the unread counter in the final commit.
+    Returns the new ids.
+    """
+    if not documents:
+        return []
+    now = datetime.utcnow().isoformat() + 'Z'
+    for doc in documents:
+        doc.setdefault('created_at', now)
+        doc.setdefault('read', False)
+    unread = sum(1 for d in documents if not d.get('read'))
+    _ensure_counter()
+    ids = add_documents_batch(NOTIFICATIONS, documents, counter=COUNTER + (unread,) if unread else None)
+    if ids and unread:
+        _set_unread_cache(None)
+    return ids
+
+
+def list_notifications(limit: int = 50, after_id: str | None = None, unread_only: bool = False):
+    """Return (items, next_cursor) for one newest-first page.
+    next_cursor is the id of the last item when another page may follow.
+    """
+    filters = [('read', '==', False)] if unread_only else None
+    # Fetch one extra document to know whether another page exists
+    docs = query_page(NOTIFICATIONS, 'created_at', descending=True, limit=limit + 1,
+                      start_after_id=after_id, filters=filters)
+    items = docs[:limit]
+    next_cursor = items[-1]['id'] if len(docs) > limit and items else None
+    return items, next_cursor
+
+
+@firestore.transactional
+def _mark_read_transaction(transaction, refs, counter_ref):
+    """Mark the still-unread documents among refs read and decrement the counter by that many."""
+    unread = [snap.reference for snap in transaction.get_all(refs)
+              if snap.exists and not (snap.to_dict() or {}).get('read')]
+    for ref in unread:
+        transaction.update(ref, {'read': True})
+    if unread:
+        transaction.set(counter_ref, {COUNTER[2]: firestore.Increment(-len(unread))}, merge=True)
+    return len(unread)
+
+
+def mark_read(doc_ids: list) -> int:
+    """Mark the given notifications read. Returns how many were unread.
+    The unread check and the writes share one transaction per chunk, so each
+    notification is counted once even when several requests mark it at the same time.
+    """
+    db = get_firestore_client()
+    if db is None or not doc_ids:
+        return 0
+    _ensure_counter()
+    col_ref = db.collection(NOTIFICATIONS)
+    counter_ref = db.collection(COUNTER[0]).document(COUNTER[1])
+    ids = sorted(set(doc_ids))
+    done = 0
+    try:
+        for i in range(0, len(ids), _MARK_CHUNK):
+            refs = [col_ref.document(doc_id) for doc_id in ids[i:i + _MARK_CHUNK]]
+            done += _mark_read_transaction(db.transaction(), refs, counter_ref)
+    except Exception as e:
+        logger.error(f"Error marking notifications read: {e}")
+    if done:
+        _set_unread_cache(None)
+    return done
+
+
+def mark_all_read() -> int:
+    """Mark every unread notification read. Returns the number updated."""
+    total = 0
+    while True:
+        # Always take the first page: updated documents drop out of the unread filter
+        docs = query_page(NOTIFICATIONS, 'created_at', descending=True, limit=_MARK_CHUNK,
+                          filters=[('read', '==', False)])
+        if not docs:
+            break
+        done = mark_read([d['id'] for d in docs])
+        total += done
+        if not done:
+            break
+    _set_unread_cache(None)
+    return total
+
+
+def archive_notifications(older_than_days: int | None = None, batch_size: int = 250) -> int:
+    """Move notifications older than the TTL into NOTIFICATIONS_ARCHIVE. Returns the count moved.
+    Each commit copies and deletes up to batch_size documents (two writes apiece).
+    """
+    if older_than_days is None:
+        older_than_days = getattr(settings, 'NOTIFICATION_TTL_DAYS', 90)
+    db = get_firestore_client()
+    if db is None:
+        return 0
+    cutoff = (datetime.utcnow() - timedelta(days=older_than_days)).isoformat() + 'Z'
+    col_ref, archive_ref = db.collection(NOTIFICATIONS), db.collection(NOTIFICATIONS_ARCHIVE)
+    moved = 0
+    while True:
+        docs = query_page(NOTIFICATIONS, 'created_at', limit=batch_size,
+                          filters=[('created_at', '<', cutoff)])
+        if not docs:
+            break
+        try:
+            batch = db.batch()
+            unread = 0
+            for doc in docs:
+                doc_id = doc.pop('id')
+                unread += 0 if doc.get('read') else 1
+                batch.set(archive_ref.document(doc_id), doc)
+                batch.delete(col_ref.document(doc_id))
+            batch.commit()
+        except Exception as e:
+            logger.error(f"Error archiving notifications: {e}")
+            break
+        _adjust_unread(-unread)
+        moved += len(docs)
+    return moved
+
+
+def recount_unread() -> int:
+    """Recompute the unread counter from the collection (repair path). Returns the new value."""
+    db = get_firestore_client()
+    if db is None:
+        return 0
+    try:
+        result = db.collection(NOTIFICATIONS).where('read', '==', False).count().get()
+        value = int(result[0][0].value)
+        db.collection(COUNTER[0]).document(COUNTER[1]).set({COUNTER[2]: value}, merge=True)
+    except Exception as e:
+        logger.error(f"Error recounting unread notifications: {e}")
+        return 0
+    _set_unread_cache(value)
+    return value
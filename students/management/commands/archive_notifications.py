@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from students.inbox import archive_notifications, recount_unread
+
+
+class Command(BaseCommand):
+    help = 'Move notifications older than NOTIFICATION_TTL_DAYS to notifications_archive (run daily)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=None,
+            help='Archive notifications older than this many days (defaults to NOTIFICATION_TTL_DAYS)',
+        )
+        parser.add_argument(
+            '--recount',
+            action='store_true',
+            help='Also recompute the unread counter from the collection',
+        )
+
+    def handle(self, *args, **options):
+        days = options['days'] if options['days'] is not None else settings.NOTIFICATION_TTL_DAYS
+        moved = archive_notifications(days)
+        self.stdout.write(self.style.SUCCESS(f'Archived {moved} notifications older than {days} days'))
+        if options['recount']:
+            self.stdout.write(self.style.SUCCESS(f'Unread counter reset to {recount_unread()}'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from mini_erp.firebase_utils import iter_documents, update_documents_batch
+from mini_erp.firestore_filters import NORMALIZED_FIELDS, normalize_document
+
+
+class Command(BaseCommand):
+    help = "Add the lowercased filter fields (status_lc, subject_lc) to existing Firestore documents"
+
+    def handle(self, *args, **options):
+        for collection, fields in NORMALIZED_FIELDS.items():
+            updates = {}
+            for doc in iter_documents(collection):
+                source = {f: doc[f] for f in fields if f in doc}
+                normalized = normalize_document(collection, dict(source))
+                changes = {k: v for k, v in normalized.items() if k not in source and doc.get(k) != v}
+                if changes:
+                    updates[doc['id']] = changes
+            done = update_documents_batch(collection, updates) if updates else 0
+            self.stdout.write(self.style.SUCCESS(f"{collection}: normalized {done} documents"))
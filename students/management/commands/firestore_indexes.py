@@ -0,0 +1,29 @@
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from mini_erp.firestore_filters import index_manifest
+
+
+class Command(BaseCommand):
+    help = "Write firestore.indexes.json for the API filter specs (deploy with `firebase deploy --only firestore:indexes`)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            type=str,
+            default=str(Path(settings.BASE_DIR) / 'firestore.indexes.json'),
+            help='Path of the manifest to write ("-" prints it)',
+        )
+
+    def handle(self, *args, **options):
+        manifest = json.dumps(index_manifest(), indent=2) + '\n'
+        if options['output'] == '-':
+            self.stdout.write(manifest)
+            return
+        Path(options['output']).write_text(manifest, encoding='utf-8')
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {len(index_manifest()['indexes'])} indexes to {options['output']}"
+        ))
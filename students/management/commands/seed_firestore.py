@@ -2,6 +2,8 @@ import json
 from pathlib import Path
 from django.core.management.base import BaseCommand, CommandError
 from mini_erp.firebase_utils import add_document
+from mini_erp.firestore_filters import normalize_document
+from students.inbox import add_notifications
 
 class Command(BaseCommand):
     help = "Seed Firestore with dummy data from a JSON file"
@@ -18,11 +20,15 @@ class Command(BaseCommand):
         total = 0
         for collection in ['admissions', 'attendance', 'fees', 'exams', 'notifications']:
             docs = data.get(collection, [])
+            if collection == 'notifications':
+                # Goes through the inbox so the unread counter stays in step
+                total += len(add_notifications(docs))
+                continue
             for doc in docs:
                 # For admissions, use student_id as the Firestore document ID so detail page works
                 if collection == 'admissions' and doc.get('student_id'):
                     add_document(collection, doc, doc.get('student_id'))
                 else:
-                    add_document(collection, doc)
+                    add_document(collection, normalize_document(collection, doc))
                 total += 1
         self.stdout.write(self.style.SUCCESS(f"Seeded {total} documents from {file_path}"))
@@ -6,6 +6,7 @@ app_name = 'students'
 urlpatterns = [
     # Attendance
     path('attendance/', views.attendance_collection, name='attendance_collection'),
+    path('attendance/bulk/', views.attendance_bulk, name='attendance_bulk'),
     path('attendance/<str:doc_id>/', views.attendance_document, name='attendance_document'),
 
     # Fees (Firestore-backed API, separate from existing fees app)
@@ -18,6 +19,8 @@ urlpatterns = [
 
     # Notifications
     path('notifications/', views.notifications_collection, name='notifications_collection'),
+    path('notifications/read-all/', views.notifications_mark_all_read, name='notifications_mark_all_read'),
+    path('notifications/unread-count/', views.notifications_unread_count, name='notifications_unread_count'),
     path('notifications/<str:doc_id>/read/', views.notification_mark_read, name='notification_mark_read'),
 
     # Student profiles
@@ -38,6 +41,7 @@ urlpatterns = [
     path('me/hostel/', views.hostel_applications_page, name='hostel_applications_page'),
     path('me/risk-summary/', views.student_risk_summary, name='student_risk_summary'),
     path('my/fees/', views.my_fees, name='my_fees'),
+    path('me/bootstrap/', views.student_bootstrap, name='student_bootstrap'),
 
     # Admin/Counselor pages
     path('admin/leaves/', views.admin_leaves_page, name='admin_leaves_page'),
@@ -1,4 +1,5 @@
 import json
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, date
 from django.shortcuts import render
 from django.http import JsonResponse, HttpResponseBadRequest, HttpResponseNotAllowed
@@ -8,6 +9,7 @@ from django.utils.timezone import make_aware
 from django.core.mail import send_mail
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.db.models import Count, Max
 
 from mini_erp.firebase_utils import (
     add_document,
@@ -17,9 +19,15 @@ from mini_erp.firebase_utils import (
     delete_document,
     query_collection,
     get_firestore_client,
+    iter_documents,
 )
-from mini_erp.auth import role_required
+from mini_erp.auth import get_student_id_for_user, role_required
+from mini_erp.conditional import collection_etag, etag_condition
+from mini_erp.idempotency import idempotent
+from mini_erp.firestore_filters import compile_filters, normalize_document
+from mini_erp.streaming import list_response, stream_format
 from admissions.models import Admission
+from dashboard.risk_rules import get_risk_rules
 
 # ------------------------------
 # Student Profile (Firestore SoT)
@@ -37,7 +45,7 @@ def profile_collection(request):
     if request.method == 'GET':
         if not user_in_groups(request.user, ['admin', 'counselor']):
             # Students: return only self
-            sid = _get_student_id_for_user(request.user)
+            sid = get_student_id_for_user(request.user)
             if not sid:
                 return JsonResponse({'items': []})
             doc = get_document('students', sid)
@@ -53,7 +61,7 @@ def profile_collection(request):
     # Determine target student_id
     sid = data.get('student_id')
     if not user_in_groups(request.user, ['admin', 'counselor']):
-        sid = _get_student_id_for_user(request.user)
+        sid = get_student_id_for_user(request.user)
     if not sid:
         return HttpResponseBadRequest('student_id required')
     payload = {
@@ -85,7 +93,7 @@ def profile_document(request, student_id: str):
     if request.method == 'GET':
         # Admin/counselor can see any; students can view self only
         if not user_in_groups(request.user, ['admin', 'counselor']):
-            my_sid = _get_student_id_for_user(request.user)
+            my_sid = get_student_id_for_user(request.user)
             if my_sid != student_id:
                 return JsonResponse({'error': 'Forbidden'}, status=403)
         doc = get_document('students', student_id)
@@ -99,7 +107,7 @@ def profile_document(request, student_id: str):
         return JsonResponse({'deleted': ok})
     # PUT update
     if not user_in_groups(request.user, ['admin', 'counselor']):
-        my_sid = _get_student_id_for_user(request.user)
+        my_sid = get_student_id_for_user(request.user)
         if my_sid != student_id:
             return JsonResponse({'error': 'Forbidden'}, status=403)
         
@@ -127,7 +135,7 @@ def leaves_collection(request):
     if request.method == 'GET':
         docs = get_all_documents('leaves')
         if not user_in_groups(request.user, ['admin', 'counselor', 'teacher']):
-            my_sid = _get_student_id_for_user(request.user)
+            my_sid = get_student_id_for_user(request.user)
             docs = [d for d in docs if d.get('student_id') == my_sid]
         return JsonResponse({'items': docs})
     # POST
@@ -136,7 +144,7 @@ def leaves_collection(request):
         return HttpResponseBadRequest('Invalid JSON')
     sid = data.get('student_id')
     if not user_in_groups(request.user, ['admin', 'counselor', 'teacher']):
-        sid = _get_student_id_for_user(request.user)
+        sid = get_student_id_for_user(request.user)
     if not sid:
         return HttpResponseBadRequest('student_id required')
     doc = {
@@ -164,7 +172,7 @@ def leaves_document(request, doc_id: str):
         if not doc:
             return JsonResponse({'error': 'Not found'}, status=404)
         if not user_in_groups(request.user, ['admin', 'counselor', 'teacher']):
-            my_sid = _get_student_id_for_user(request.user)
+            my_sid = get_student_id_for_user(request.user)
             if doc.get('student_id') != my_sid:
                 return JsonResponse({'error': 'Forbidden'}, status=403)
         return JsonResponse({'id': doc_id, **doc})
@@ -173,7 +181,7 @@ def leaves_document(request, doc_id: str):
         doc = get_document('leaves', doc_id)
         if not doc:
             return JsonResponse({'error': 'Not found'}, status=404)
-        if user_in_groups(request.user, ['admin']) or (doc.get('status') == 'pending' and _get_student_id_for_user(request.user) == doc.get('student_id')):
+        if user_in_groups(request.user, ['admin']) or (doc.get('status') == 'pending' and get_student_id_for_user(request.user) == doc.get('student_id')):
             ok = delete_document('leaves', doc_id)
             return JsonResponse({'deleted': ok})
         return JsonResponse({'error': 'Forbidden'}, status=403)
@@ -183,7 +191,7 @@ def leaves_document(request, doc_id: str):
         return HttpResponseBadRequest('Invalid JSON')
     # Only admin/teacher/counselor can change status; owners can edit reason/dates if pending
     doc = get_document('leaves', doc_id) or {}
-    my_sid = _get_student_id_for_user(request.user)
+    my_sid = get_student_id_for_user(request.user)
     update_data = {}
     if user_in_groups(request.user, ['admin', 'counselor', 'teacher']):
         if 'status' in data:
@@ -216,7 +224,7 @@ def hostel_applications_collection(request):
     if request.method == 'GET':
         docs = get_all_documents('hostel_requests')
         if not user_in_groups(request.user, ['admin', 'counselor']):
-            my_sid = _get_student_id_for_user(request.user)
+            my_sid = get_student_id_for_user(request.user)
             docs = [d for d in docs if d.get('student_id') == my_sid]
         return JsonResponse({'items': docs})
     data = parse_json(request)
@@ -224,7 +232,7 @@ def hostel_applications_collection(request):
         return HttpResponseBadRequest('Invalid JSON')
     sid = data.get('student_id')
     if not user_in_groups(request.user, ['admin', 'counselor']):
-        sid = _get_student_id_for_user(request.user)
+        sid = get_student_id_for_user(request.user)
     if not sid:
         return HttpResponseBadRequest('student_id required')
     doc = {
@@ -254,7 +262,7 @@ def hostel_applications_document(request, doc_id: str):
         if not doc:
             return JsonResponse({'error': 'Not found'}, status=404)
         if not user_in_groups(request.user, ['admin', 'counselor']):
-            my_sid = _get_student_id_for_user(request.user)
+            my_sid = get_student_id_for_user(request.user)
             if doc.get('student_id') != my_sid:
                 return JsonResponse({'error': 'Forbidden'}, status=403)
         return JsonResponse({'id': doc_id, **doc})
@@ -262,7 +270,7 @@ def hostel_applications_document(request, doc_id: str):
         doc = get_document('hostel_requests', doc_id)
         if not doc:
             return JsonResponse({'error': 'Not found'}, status=404)
-        if user_in_groups(request.user, ['admin']) or (doc.get('status') == 'pending' and _get_student_id_for_user(request.user) == doc.get('student_id')):
+        if user_in_groups(request.user, ['admin']) or (doc.get('status') == 'pending' and get_student_id_for_user(request.user) == doc.get('student_id')):
             ok = delete_document('hostel_requests', doc_id)
             return JsonResponse({'deleted': ok})
         return JsonResponse({'error': 'Forbidden'}, status=403)
@@ -323,20 +331,6 @@ def admin_hostel_page(request):
 
 # Utilities and remaining imports are defined above.
 
-def _get_student_id_for_user(user):
-    try:
-        if not getattr(user, 'is_authenticated', False):
-            return None
-        # Prefer user.student_id if available
-        sid = getattr(user, 'student_id', None)
-        if sid:
-            return sid
-        # Fallback to mapping by Admission email
-        adm = Admission.objects.filter(email=user.email).first()
-        return adm.student_id if adm else None
-    except Exception:
-        return None
-
 
 # ------------------------------
 # Student Profile (Firestore SoT)
@@ -354,14 +348,14 @@ def profile_collection(request):
     if request.method == 'GET':
         if not user_in_groups(request.user, ['admin', 'counselor']):
             # Students: return only self
-            sid = _get_student_id_for_user(request.user)
+            sid = get_student_id_for_user(request.user)
             if not sid:
                 return JsonResponse({'items': []})
             doc = get_document('students', sid)
             return JsonResponse({'items': [doc] if doc else []})
         # Admin/counselor: list all
-        docs = get_all_documents('students')
-        return JsonResponse({'items': docs})
+        source = iter_documents if stream_format(request) else get_all_documents
+        return list_response(request, source('students'))
 
     # POST create/update
     data = parse_json(request)
@@ -370,7 +364,7 @@ def profile_collection(request):
     # Determine target student_id
     sid = data.get('student_id')
     if not user_in_groups(request.user, ['admin', 'counselor']):
-        sid = _get_student_id_for_user(request.user)
+        sid = get_student_id_for_user(request.user)
     if not sid:
         return HttpResponseBadRequest('student_id required')
     payload = {
@@ -402,7 +396,7 @@ def profile_document(request, student_id: str):
     if request.method == 'GET':
         # Admin/counselor can see any; students can view self only
         if not user_in_groups(request.user, ['admin', 'counselor']):
-            my_sid = _get_student_id_for_user(request.user)
+            my_sid = get_student_id_for_user(request.user)
             if my_sid != student_id:
                 return JsonResponse({'error': 'Forbidden'}, status=403)
         doc = get_document('students', student_id)
@@ -416,7 +410,7 @@ def profile_document(request, student_id: str):
         return JsonResponse({'deleted': ok})
     # PUT update
     if not user_in_groups(request.user, ['admin', 'counselor']):
-        my_sid = _get_student_id_for_user(request.user)
+        my_sid = get_student_id_for_user(request.user)
         if my_sid != student_id:
             return JsonResponse({'error': 'Forbidden'}, status=403)
     data = parse_json(request)
@@ -435,6 +429,8 @@ def profile_document(request, student_id: str):
 @csrf_exempt
 @require_http_methods(["GET", "POST"])
 @login_required
+@etag_condition(collection_etag('leaves'))
+@idempotent
 def leaves_collection(request):
     """GET: list leaves (admin/counselor see all; students see self). POST: submit leave.
     Collection: 'leaves' with fields student_id, start_date, end_date, reason, status.
@@ -445,7 +441,7 @@ def leaves_collection(request):
         start_snapshot_watch('leaves')
         docs = get_all_documents_cached('leaves', ttl_seconds=15)
         if not user_in_groups(request.user, ['admin', 'counselor', 'teacher']):
-            my_sid = _get_student_id_for_user(request.user)
+            my_sid = get_student_id_for_user(request.user)
             docs = [d for d in docs if d.get('student_id') == my_sid]
         return JsonResponse({'items': docs})
     # POST
@@ -454,7 +450,7 @@ def leaves_collection(request):
         return HttpResponseBadRequest('Invalid JSON')
     sid = data.get('student_id')
     if not user_in_groups(request.user, ['admin', 'counselor', 'teacher']):
-        sid = _get_student_id_for_user(request.user)
+        sid = get_student_id_for_user(request.user)
     if not sid:
         return HttpResponseBadRequest('student_id required')
     doc = {
@@ -482,7 +478,7 @@ def leaves_document(request, doc_id: str):
         if not doc:
             return JsonResponse({'error': 'Not found'}, status=404)
         if not user_in_groups(request.user, ['admin', 'counselor', 'teacher']):
-            my_sid = _get_student_id_for_user(request.user)
+            my_sid = get_student_id_for_user(request.user)
             if doc.get('student_id') != my_sid:
                 return JsonResponse({'error': 'Forbidden'}, status=403)
         return JsonResponse({'id': doc_id, **doc})
@@ -491,7 +487,7 @@ def leaves_document(request, doc_id: str):
         doc = get_document('leaves', doc_id)
         if not doc:
             return JsonResponse({'error': 'Not found'}, status=404)
-        if user_in_groups(request.user, ['admin']) or (doc.get('status') == 'pending' and _get_student_id_for_user(request.user) == doc.get('student_id')):
+        if user_in_groups(request.user, ['admin']) or (doc.get('status') == 'pending' and get_student_id_for_user(request.user) == doc.get('student_id')):
             ok = delete_document('leaves', doc_id)
             return JsonResponse({'deleted': ok})
         return JsonResponse({'error': 'Forbidden'}, status=403)
@@ -501,7 +497,7 @@ def leaves_document(request, doc_id: str):
         return HttpResponseBadRequest('Invalid JSON')
     # Only admin/teacher/counselor can change status; owners can edit reason/dates if pending
     doc = get_document('leaves', doc_id) or {}
-    my_sid = _get_student_id_for_user(request.user)
+    my_sid = get_student_id_for_user(request.user)
     update_data = {}
     if user_in_groups(request.user, ['admin', 'counselor', 'teacher']):
         if 'status' in data:
@@ -526,6 +522,7 @@ def leaves_document(request, doc_id: str):
 @csrf_exempt
 @require_http_methods(["GET", "POST"])
 @login_required
+@etag_condition(collection_etag('hostel_requests'))
 def hostel_applications_collection(request):
     """GET: list hostel applications; POST: submit new application.
     Uses 'hostel_requests' collection.
@@ -536,7 +533,7 @@ def hostel_applications_collection(request):
         start_snapshot_watch('hostel_requests')
         docs = get_all_documents_cached('hostel_requests', ttl_seconds=15)
         if not user_in_groups(request.user, ['admin', 'counselor']):
-            my_sid = _get_student_id_for_user(request.user)
+            my_sid = get_student_id_for_user(request.user)
             docs = [d for d in docs if d.get('student_id') == my_sid]
         return JsonResponse({'items': docs})
     data = parse_json(request)
@@ -544,7 +541,7 @@ def hostel_applications_collection(request):
         return HttpResponseBadRequest('Invalid JSON')
     sid = data.get('student_id')
     if not user_in_groups(request.user, ['admin', 'counselor']):
-        sid = _get_student_id_for_user(request.user)
+        sid = get_student_id_for_user(request.user)
     if not sid:
         return HttpResponseBadRequest('student_id required')
     doc = {
@@ -574,7 +571,7 @@ def hostel_applications_document(request, doc_id: str):
         if not doc:
             return JsonResponse({'error': 'Not found'}, status=404)
         if not user_in_groups(request.user, ['admin', 'counselor']):
-            my_sid = _get_student_id_for_user(request.user)
+            my_sid = get_student_id_for_user(request.user)
             if doc.get('student_id') != my_sid:
                 return JsonResponse({'error': 'Forbidden'}, status=403)
         return JsonResponse({'id': doc_id, **doc})
@@ -582,7 +579,7 @@ def hostel_applications_document(request, doc_id: str):
         doc = get_document('hostel_requests', doc_id)
         if not doc:
             return JsonResponse({'error': 'Not found'}, status=404)
-        if user_in_groups(request.user, ['admin']) or (doc.get('status') == 'pending' and _get_student_id_for_user(request.user) == doc.get('student_id')):
+        if user_in_groups(request.user, ['admin']) or (doc.get('status') == 'pending' and get_student_id_for_user(request.user) == doc.get('student_id')):
             ok = delete_document('hostel_requests', doc_id)
             return JsonResponse({'deleted': ok})
         return JsonResponse({'error': 'Forbidden'}, status=403)
@@ -660,30 +657,8 @@ def student_risk_summary(request):
                 'reasons': ['Student ID not found']
             })
         
-        # Calculate risk using existing function
+        # evaluate_risk already attaches risk_score and risk_level from the shared rules
         risk_data = evaluate_risk(student_id)
-        
-        # Add risk level calculation
-        risk_score = 0
-        if risk_data.get('attendance_percent', 100) < 50:
-            risk_score += 2
-        elif risk_data.get('attendance_percent', 100) < 75:
-            risk_score += 1
-        if risk_data.get('overdue_fees', False):
-            risk_score += 1
-        if risk_data.get('failing_grades', False):
-            risk_score += 2
-            
-        if risk_score >= 3:
-            risk_level = 'High'
-        elif risk_score >= 1:
-            risk_level = 'Medium'
-        else:
-            risk_level = 'Low'
-            
-        risk_data['risk_level'] = risk_level
-        risk_data['risk_score'] = risk_score
-        
         return JsonResponse(risk_data)
         
     except Exception as e:
@@ -721,10 +696,25 @@ def _filter_params(request):
     }
 
 
-# Risk evaluation
+def _list_collection(request, collection: str):
+    """List a collection with the request's filters pushed down to Firestore.
+    Unfiltered, non-streamed reads go through get_all_documents() to keep the cache warm.
+    """
+    filters = compile_filters(collection, _filter_params(request))
+    if stream_format(request):
+        rows = iter_documents(collection, filters)
+    elif filters:
+        try:
+            rows = list(iter_documents(collection, filters))
+        except Exception:
+            # Already logged by iter_documents; answer like get_all_documents() does on errors
+            rows = []
+    else:
+        rows = get_all_documents(collection)
+    return list_response(request, rows)
+
 
-ATTENDANCE_THRESHOLD = 75.0
-FAIL_GRADE_PERCENT = 40.0
+# Risk evaluation (thresholds and weights come from dashboard.risk_rules)
 
 
 def get_attendance_rate(student_id: str) -> float:
@@ -756,13 +746,14 @@ def is_failing(student_id: str) -> bool:
     if not student_id:
         return False
     docs = query_collection('exams', 'student_id', '==', student_id)
+    rules = get_risk_rules()
     failing_any = False
     for d in docs:
         try:
             score = float(d.get('score', 0))
             total = float(d.get('total', 100)) or 100.0
             percent = (score / total) * 100.0
-            if percent < FAIL_GRADE_PERCENT:
+            if rules.is_failing_percent(percent):
                 failing_any = True
                 break
         except Exception:
@@ -770,17 +761,13 @@ def is_failing(student_id: str) -> bool:
     return failing_any
 
 
-def evaluate_risk(student_id: str):
+def evaluate_risk(student_id: str, attendance_threshold: float | None = None):
+    rules = get_risk_rules()
     att = get_attendance_rate(student_id)
     overdue = has_overdue_fees(student_id)
     failing = is_failing(student_id)
-    reasons = []
-    if att < ATTENDANCE_THRESHOLD:
-        reasons.append(f"Attendance {att}% < {ATTENDANCE_THRESHOLD}%")
-    if overdue:
-        reasons.append("Overdue fee(s)")
-    if failing:
-        reasons.append("Failing grades")
+    reasons = rules.reasons(att, overdue, failing, attendance_threshold)
+    score, level = rules.score_and_level(att, overdue, failing)
     return {
         'student_id': student_id,
         'at_risk': len(reasons) > 0,
@@ -788,35 +775,17 @@ def evaluate_risk(student_id: str):
         'overdue_fees': overdue,
         'failing_grades': failing,
         'reasons': reasons,
+        'risk_score': score,
+        'risk_level': level,
     }
 
 
-def send_alerts(student_id: str, reasons: list):
-    # In-app notification
-    adm = Admission.objects.filter(student_id=student_id).first()
-    notif = {
-        'student_id': student_id,
-        'student_name': f"{adm.first_name} {adm.last_name}" if adm else '',
-        'type': 'risk_alert',
-        'message': f"Student {student_id} flagged: {', '.join(reasons)}",
-        'reasons': reasons,
-        'created_at': datetime.utcnow().isoformat() + 'Z',
-        'read': False,
-    }
-    add_document('notifications', notif)
-
-    # Email alert (best-effort)
-    if adm and settings.EMAIL_HOST_USER and settings.EMAIL_HOST_PASSWORD:
-        try:
-            send_mail(
-                subject=f"Student {student_id} at-risk alert",
-                message=notif['message'],
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[adm.email],
-                fail_silently=True,
-            )
-        except Exception:
-            pass
+def send_alerts(student_id: str, risk: dict):
+    """Queue an in-app + email risk alert; duplicates within the dedupe window are dropped
+    and the rest are written in batches (see students/alerts.py).
+    """
+    from students.alerts import queue_alert
+    queue_alert(student_id, risk)
 
 
 def send_status_email(student_id: str, subject: str, message: str):
@@ -842,18 +811,10 @@ def send_status_email(student_id: str, subject: str, message: str):
 @csrf_exempt
 @role_required(['admin', 'teacher'])
 @require_http_methods(["GET", "POST"])
+@idempotent
 def attendance_collection(request):
     if request.method == 'GET':
-        params = _filter_params(request)
-        docs = get_all_documents('attendance')
-        # Filter in memory (could be moved to Firestore composite indexes for scale)
-        if params['student_id']:
-            docs = [d for d in docs if d.get('student_id') == params['student_id']]
-        if params['from']:
-            docs = [d for d in docs if d.get('date') and d['date'] >= params['from']]
-        if params['to']:
-            docs = [d for d in docs if d.get('date') and d['date'] <= params['to']]
-        return JsonResponse({'items': docs})
+        return _list_collection(request, 'attendance')
 
     data = parse_json(request)
     if data is None:
@@ -870,7 +831,7 @@ def attendance_collection(request):
         # Evaluate and alert
         result = evaluate_risk(doc['student_id'])
         if result['at_risk']:
-            send_alerts(doc['student_id'], result['reasons'])
+            send_alerts(doc['student_id'], result)
         return JsonResponse({'id': doc_id, **doc}, status=201)
     return HttpResponseBadRequest('Failed to create attendance record')
 
@@ -904,7 +865,7 @@ def attendance_document(request, doc_id: str):
             if sid:
                 result = evaluate_risk(sid)
                 if result['at_risk']:
-                    send_alerts(sid, result['reasons'])
+                    send_alerts(sid, result)
             return JsonResponse({'updated': True})
         return HttpResponseBadRequest('Update failed')
 
@@ -913,24 +874,82 @@ def attendance_document(request, doc_id: str):
     return JsonResponse({'deleted': ok})
 
 
+@csrf_exempt
+@role_required(['admin', 'teacher'])
+@require_http_methods(["POST"])
+@idempotent
+def attendance_bulk(request):
+    """Mark a whole class roster in one request.
+    Body: {"date", "subject", "period", "entries": [{"student_id", "present"}, ...]}.
+    Rows already recorded for (student_id, date, period) are updated only if presence
+    changed; new rows are written in batched commits and one batched risk
+    re-evaluation is scheduled for the affected students.
+    """
+    from mini_erp.firebase_utils import add_documents_batch, update_documents_batch
+    from students.alerts import schedule_risk_check
+    data = parse_json(request)
+    if data is None:
+        return HttpResponseBadRequest('Invalid JSON')
+    entries = data.get('entries')
+    if not isinstance(entries, list) or not entries:
+        return HttpResponseBadRequest('entries must be a non-empty list')
+    day = to_iso_date(data.get('date') or date.today())
+    subject = data.get('subject')
+    period = data.get('period')
+
+    # Last entry per student wins within the payload
+    roster = {}
+    for entry in entries:
+        if not isinstance(entry, dict) or not entry.get('student_id'):
+            return HttpResponseBadRequest('each entry needs a student_id')
+        roster[entry['student_id']] = bool(entry.get('present', True))
+
+    existing = {
+        d.get('student_id'): d
+        for d in query_collection('attendance', 'date', '==', day)
+        if d.get('period') == period and d.get('student_id') in roster
+    }
+    created_at = datetime.utcnow().isoformat() + 'Z'
+    to_create, to_update = [], {}
+    for sid, present in roster.items():
+        doc = existing.get(sid)
+        if doc is None:
+            to_create.append({
+                'student_id': sid,
+                'date': day,
+                'present': present,
+                'subject': subject,
+                'period': period,
+                'created_at': created_at,
+            })
+        elif doc.get('present') is not present:
+            to_update[doc['id']] = {'present': present}
+
+    ids = add_documents_batch('attendance', to_create) if to_create else []
+    if to_create and not ids:
+        return HttpResponseBadRequest('Failed to create attendance records')
+    updated = update_documents_batch('attendance', to_update) if to_update else 0
+    changed = [d['student_id'] for d in to_create]
+    changed += [sid for sid, doc in existing.items() if doc['id'] in to_update]
+    schedule_risk_check(changed)
+    return JsonResponse({
+        'date': day,
+        'created': len(ids),
+        'updated': updated,
+        'unchanged': len(roster) - len(to_create) - len(to_update),
+        'ids': ids,
+    }, status=201)
+
+
 # Fees endpoints (Firestore-backed)
 
 @csrf_exempt
 @role_required(['admin', 'accountant'])
 @require_http_methods(["GET", "POST"])
+@idempotent
 def fees_collection(request):
     if request.method == 'GET':
-        params = _filter_params(request)
-        docs = get_all_documents('fees')
-        if params['student_id']:
-            docs = [d for d in docs if d.get('student_id') == params['student_id']]
-        if params['status']:
-            docs = [d for d in docs if (d.get('status') or '').lower() == params['status'].lower()]
-        if params['from']:
-            docs = [d for d in docs if d.get('due_date') and d['due_date'] >= params['from']]
-        if params['to']:
-            docs = [d for d in docs if d.get('due_date') and d['due_date'] <= params['to']]
-        return JsonResponse({'items': docs})
+        return _list_collection(request, 'fees')
 
     data = parse_json(request)
     if data is None:
@@ -943,11 +962,11 @@ def fees_collection(request):
         'due_date': to_iso_date(data.get('due_date') or date.today()),
         'created_at': datetime.utcnow().isoformat() + 'Z',
     }
-    doc_id = add_document('fees', doc)
+    doc_id = add_document('fees', normalize_document('fees', doc))
     if doc_id:
         result = evaluate_risk(doc['student_id'])
         if result['at_risk']:
-            send_alerts(doc['student_id'], result['reasons'])
+            send_alerts(doc['student_id'], result)
         return JsonResponse({'id': doc_id, **doc}, status=201)
     return HttpResponseBadRequest('Failed to create fee record')
 
@@ -975,14 +994,14 @@ def fees_document(request, doc_id: str):
             update_data['due_date'] = to_iso_date(data['due_date'])
         if not update_data:
             return HttpResponseBadRequest('No fields to update')
-        ok = update_document('fees', doc_id, update_data)
+        ok = update_document('fees', doc_id, normalize_document('fees', update_data))
         if ok:
             doc = get_document('fees', doc_id) or {}
             sid = doc.get('student_id') or data.get('student_id')
             if sid:
                 result = evaluate_risk(sid)
                 if result['at_risk']:
-                    send_alerts(sid, result['reasons'])
+                    send_alerts(sid, result)
             return JsonResponse({'updated': True})
         return HttpResponseBadRequest('Update failed')
 
@@ -995,15 +1014,10 @@ def fees_document(request, doc_id: str):
 @csrf_exempt
 @role_required(['admin', 'teacher'])
 @require_http_methods(["GET", "POST"])
+@idempotent
 def exams_collection(request):
     if request.method == 'GET':
-        params = _filter_params(request)
-        docs = get_all_documents('exams')
-        if params['student_id']:
-            docs = [d for d in docs if d.get('student_id') == params['student_id']]
-        if params['subject']:
-            docs = [d for d in docs if (d.get('subject') or '').lower() == params['subject'].lower()]
-        return JsonResponse({'items': docs})
+        return _list_collection(request, 'exams')
 
     data = parse_json(request)
     if data is None:
@@ -1016,11 +1030,11 @@ def exams_collection(request):
         'exam_date': to_iso_date(data.get('exam_date') or date.today()),
         'created_at': datetime.utcnow().isoformat() + 'Z',
     }
-    doc_id = add_document('exams', doc)
+    doc_id = add_document('exams', normalize_document('exams', doc))
     if doc_id:
         result = evaluate_risk(doc['student_id'])
         if result['at_risk']:
-            send_alerts(doc['student_id'], result['reasons'])
+            send_alerts(doc['student_id'], result)
         return JsonResponse({'id': doc_id, **doc}, status=201)
     return HttpResponseBadRequest('Failed to create exam record')
 
@@ -1050,14 +1064,14 @@ def exams_document(request, doc_id: str):
             update_data['exam_date'] = to_iso_date(data['exam_date'])
         if not update_data:
             return HttpResponseBadRequest('No fields to update')
-        ok = update_document('exams', doc_id, update_data)
+        ok = update_document('exams', doc_id, normalize_document('exams', update_data))
         if ok:
             doc = get_document('exams', doc_id) or {}
             sid = doc.get('student_id') or data.get('student_id')
             if sid:
                 result = evaluate_risk(sid)
                 if result['at_risk']:
-                    send_alerts(sid, result['reasons'])
+                    send_alerts(sid, result)
             return JsonResponse({'updated': True})
         return HttpResponseBadRequest('Update failed')
 
@@ -1071,19 +1085,50 @@ def exams_document(request, doc_id: str):
 @role_required(['admin', 'teacher', 'accountant', 'counselor'])
 @require_http_methods(["GET"])
 def notifications_collection(request):
-    docs = get_all_documents('notifications')
+    """Newest-first page of notifications. Query params: unread, limit (max 200), cursor."""
+    from .inbox import list_notifications, unread_count
     unread_only = request.GET.get('unread') in ['1', 'true', 'yes']
-    if unread_only:
-        docs = [d for d in docs if not d.get('read')]
-    return JsonResponse({'items': docs})
+    try:
+        limit = min(max(int(request.GET.get('limit', 50)), 1), 200)
+    except ValueError:
+        return HttpResponseBadRequest('limit must be an integer')
+    items, next_cursor = list_notifications(limit=limit, after_id=request.GET.get('cursor') or None,
+                                            unread_only=unread_only)
+    return JsonResponse({'items': items, 'unread': unread_count(), 'next_cursor': next_cursor})
 
 
 @csrf_exempt
 @role_required(['admin', 'teacher', 'accountant', 'counselor'])
 @require_http_methods(["POST"])
 def notification_mark_read(request, doc_id: str):
-    ok = update_document('notifications', doc_id, {'read': True})
-    return JsonResponse({'updated': ok})
+    from .inbox import mark_read, unread_count
+    updated = mark_read([doc_id])
+    if not updated:
+        return JsonResponse({'error': 'Notification not found or already read'}, status=404)
+    return JsonResponse({'updated': updated, 'unread': unread_count()})
+
+
+@csrf_exempt
+@role_required(['admin', 'teacher', 'accountant', 'counselor'])
+@require_http_methods(["POST"])
+def notifications_mark_all_read(request):
+    """Mark notifications read in batched writes. Optional JSON body {"ids": [...]} limits the set."""
+    from .inbox import mark_all_read, mark_read, unread_count
+    ids = None
+    if request.body:
+        try:
+            ids = json.loads(request.body.decode('utf-8')).get('ids')
+        except Exception:
+            return HttpResponseBadRequest('Invalid JSON')
+    updated = mark_read(ids) if ids else mark_all_read()
+    return JsonResponse({'updated': updated, 'unread': unread_count()})
+
+
+@role_required(['admin', 'teacher', 'accountant', 'counselor'])
+@require_http_methods(["GET"])
+def notifications_unread_count(request):
+    from .inbox import unread_count
+    return JsonResponse({'unread': unread_count()})
 
 
 # Student-only minimal fees endpoint using cached Firestore data
@@ -1091,10 +1136,11 @@ from django.contrib.auth.decorators import login_required
 
 @login_required
 @require_http_methods(["GET"])
+@etag_condition(collection_etag('fees'))
 def my_fees(request):
     """Return the logged-in student's own fees using cached Firestore data to minimize reads."""
     try:
-        sid = _get_student_id_for_user(request.user)
+        sid = get_student_id_for_user(request.user)
         if not sid:
             return JsonResponse({'items': []})
         from mini_erp.firebase_utils import get_all_documents_cached, start_snapshot_watch
@@ -1104,3 +1150,67 @@ def my_fees(request):
         return JsonResponse({'items': items})
     except Exception:
         return JsonResponse({'items': []})
+
+
+# Student dashboard bootstrap: every card's data in one response
+
+_bootstrap_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix='student-bootstrap')
+
+
+def _bootstrap_local_state(request):
+    from applications.models import LeaveApplication, HostelApplication
+    from dashboard.risk_rules import get_risk_rules
+    parts = [date.today().isoformat(), get_risk_rules().version]
+    for model in (LeaveApplication, HostelApplication):
+        state = model.objects.filter(student=request.user).aggregate(latest=Max('updated_at'), count=Count('id'))
+        parts.append(f"{state['latest']}:{state['count']}")
+    return '|'.join(parts)
+
+
+_bootstrap_etag = collection_etag('leaves', 'hostel_requests', 'fees', 'attendance', 'exams',
+                                  extra=_bootstrap_local_state)
+
+
+def _own_docs(collection: str, sid: str):
+    from mini_erp.firebase_utils import get_all_documents_cached, start_snapshot_watch
+    start_snapshot_watch(collection)
+    return [d for d in get_all_documents_cached(collection, ttl_seconds=15) if d.get('student_id') == sid]
+
+
+@login_required
+@require_http_methods(["GET"])
+@etag_condition(_bootstrap_etag)
+def student_bootstrap(request):
+    """Leaves, hostel applications, fees and risk summary for the logged-in student.
+    The Firestore reads run concurrently against the shared caches; 'version' changes
+    whenever any of the underlying data does (it is also the response ETag).
+    """
+    from applications.models import LeaveApplication, HostelApplication
+    from applications.views import serialize_hostel_application, serialize_leave
+    from dashboard.risk_engine import student_risk
+
+    sid = get_student_id_for_user(request.user)
+    # Memoized on the request by the etag_condition check, so this is not recomputed
+    payload = {'student_id': sid, 'version': _bootstrap_etag(request)}
+    if get_firestore_client() is not None and sid:
+        futures = {
+            'leaves': _bootstrap_pool.submit(_own_docs, 'leaves', sid),
+            'hostel': _bootstrap_pool.submit(_own_docs, 'hostel_requests', sid),
+            'fees': _bootstrap_pool.submit(_own_docs, 'fees', sid),
+            'risk': _bootstrap_pool.submit(student_risk, sid),
+        }
+        for name, future in futures.items():
+            try:
+                payload[name] = future.result(timeout=20)
+            except Exception:
+                payload[name] = None
+    # Local models stay on the request thread (ORM connections are per thread)
+    if not payload.get('leaves'):
+        leaves = LeaveApplication.objects.filter(student=request.user).select_related('student').order_by('-created_at')
+        payload['leaves'] = [serialize_leave(leave) for leave in leaves]
+    if not payload.get('hostel'):
+        apps = HostelApplication.objects.filter(student=request.user).select_related('student').order_by('-created_at')
+        payload['hostel'] = [serialize_hostel_application(app) for app in apps]
+    payload['fees'] = payload.get('fees') or []
+    payload['risk'] = payload.get('risk')
+    return JsonResponse(payload)
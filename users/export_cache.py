@@ -0,0 +1,189 @@
+"""
+On-disk cache of generated export files.
+
+An artifact is stored under a key derived from the export kind, format and
+parameters plus the state of every source it reads: digests of the Firestore
+collections as kept current by their snapshot watches (identical across
+processes holding the same data), a fingerprint of the ORM tables involved,
+the risk rules version and today's date (overdue fees depend on it).
+Repeating an export while the data is unchanged serves the stored file
+instead of re-reading Firestore and rebuilding the workbook. Keying never
+reads a collection itself: until a watch has delivered its first snapshot
+the export is simply built uncached. The directory is bounded by EXPORT_CACHE_MAX_BYTES;
+hits refresh a file's mtime and the least recently used files are evicted
+first.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from datetime import date
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.http import FileResponse
+
+from mini_erp.firebase_utils import watched_collection_digest
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.path.join('exports', 'cache')
+
+_evict_lock = threading.Lock()
+
+
+def _students_state():
+    from users.models import User
+    return User.objects.filter(role='Student').aggregate(count=Count('id'), latest=Max('updated_at'))
+
+
+def _applications_state():
+    from applications.models import HostelApplication, LeaveApplication
+    from hostel.models import HostelCapacity
+    return {
+        'leaves': LeaveApplication.objects.aggregate(count=Count('id'), latest=Max('updated_at')),
+        'hostel': HostelApplication.objects.aggregate(count=Count('id'), latest=Max('updated_at')),
+        'capacity': list(HostelCapacity.objects.order_by('room_type').values_list('room_type', 'total_capacity', 'occupied')),
+    }
+
+
+def _admissions_state():
+    """Course filters resolve students through Admission, so its changes must change the key."""
+    from admissions.models import Admission
+    return Admission.objects.aggregate(count=Count('id'), latest=Max('updated_at'))
+
+
+def _rules_version():
+    from dashboard.risk_rules import get_risk_rules
+    return get_risk_rules().version
+
+
+# kind -> (Firestore collections read, extra state functions)
+EXPORT_SOURCES = {
+    'students': ([], [_students_state]),
+    'attendance': (['attendance'], []),
+    'fees': (['fees'], []),
+    'risk_analysis': (['attendance', 'fees', 'exams'], [_rules_version]),
+    'comprehensive': (
+        ['attendance', 'fees', 'exams', 'hostel_requests', 'leaves'],
+        [_students_state, _applications_state, _rules_version],
+    ),
+}
+
+
+def max_bytes() -> int:
+    return getattr(settings, 'EXPORT_CACHE_MAX_BYTES', 512 * 1024 * 1024)
+
+
+def export_cache_key(kind: str, fmt: str = 'xlsx', params=None):
+    """Content-addressed key for an export, or None when caching is off, the kind is
+    unknown or a source collection has no watched digest yet.
+    """
+    if kind not in EXPORT_SOURCES or max_bytes() <= 0:
+        return None
+    collections, state_funcs = EXPORT_SOURCES[kind]
+    digests = {name: watched_collection_digest(name) for name in collections}
+    if not all(digests.values()):
+        return None
+    if ((params or {}).get('filters') or {}).get('course'):
+        state_funcs = [*state_funcs, _admissions_state]
+    payload = {
+        'kind': kind,
+        'format': fmt,
+        'params': params or {},
+        'date': date.today().isoformat(),
+        'collections': digests,
+        'state': [func() for func in state_funcs],
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def _cache_dir() -> str:
+    return os.path.join(settings.MEDIA_ROOT, CACHE_DIR)
+
+
+def lookup(key: str, ext: str):
+    """Path of the cached artifact (marked as recently used), or None."""
+    path = os.path.join(_cache_dir(), f'{key}.{ext}')
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        return None
+    return path
+
+
+def evict(keep=None):
+    """Remove least recently used artifacts until the directory fits EXPORT_CACHE_MAX_BYTES.
+    keep (a path) is never removed, so a file about to be served survives its own insertion.
+    """
+    limit = max_bytes()
+    if not _evict_lock.acquire(blocking=False):
+        return
+    try:
+        entries = []
+        with os.scandir(_cache_dir()) as it:
+            for entry in it:
+                if entry.is_file() and not entry.name.endswith('.part'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= limit:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+    finally:
+        _evict_lock.release()
+
+
+def cached_build(key: str, ext: str, write):
+    """Return (path, hit). On a miss write(fileobj) produces the artifact, which is
+    moved into the cache atomically before the directory is trimmed.
+    """
+    path = lookup(key, ext)
+    if path is not None:
+        return path, True
+    directory = _cache_dir()
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'{key}.{ext}')
+    with tempfile.NamedTemporaryFile(dir=directory, suffix='.part', delete=False) as output:
+        partial_path = output.name
+        try:
+            write(output)
+        except Exception:
+            output.close()
+            os.remove(partial_path)
+            raise
+    os.replace(partial_path, path)
+    try:
+        evict(keep=path)
+    except OSError as e:
+        logger.warning(f"Export cache eviction failed: {e}")
+    return path, False
+
+
+def artifact_response(kind, fmt, write, filename, content_type, params=None):
+    """FileResponse for an export artifact, served from the cache when its sources are unchanged.
+    With caching disabled the artifact goes to an anonymous temp file, deleted once sent.
+    """
+    key = export_cache_key(kind, fmt, params)
+    if key is None:
+        output = tempfile.TemporaryFile()
+        try:
+            write(output)
+        except Exception:
+            output.close()
+            raise
+        output.seek(0)
+        return FileResponse(output, as_attachment=True, filename=filename, content_type=content_type)
+    path, hit = cached_build(key, fmt, write)
+    response = FileResponse(open(path, 'rb'), as_attachment=True, filename=filename, content_type=content_type)
+    response['X-Export-Cache'] = 'hit' if hit else 'miss'
+    return response
@@ -0,0 +1,136 @@
+"""
+Non-Excel export formats for bulk pulls.
+
+?format=csv streams the record rows straight from the paginated Firestore /
+queryset iterators, so nothing is buffered beyond one chunk. ?format=parquet
+and ?format=arrow write the same rows column by column in record batches with
+zstd compression (pyarrow), which is much faster to produce and far smaller
+than xlsx, and loads directly into pandas/polars. These formats carry the
+record rows only; summary sheets are an Excel convenience and are derivable
+from the records.
+"""
+import csv
+from itertools import chain
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from mini_erp.streaming import chunked
+from users.export_cache import artifact_response
+from users.exports import (
+    ATTENDANCE_COLUMNS,
+    FEE_COLUMNS,
+    PAGE_SIZE,
+    RISK_COLUMNS,
+    STUDENT_COLUMNS,
+    attendance_rows,
+    fee_rows,
+    risk_rows,
+    student_rows,
+)
+
+FORMATS = ('xlsx', 'csv', 'parquet', 'arrow')
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'parquet': 'application/vnd.apache.parquet',
+    'arrow': 'application/vnd.apache.arrow.file',
+}
+
+# kind -> (filename prefix, columns, row generator)
+TABULAR_EXPORTS = {
+    'students': ('students_export', STUDENT_COLUMNS, student_rows),
+    'attendance': ('attendance_export', ATTENDANCE_COLUMNS, attendance_rows),
+    'fees': ('fees_export', FEE_COLUMNS, fee_rows),
+    'risk_analysis': ('risk_analysis_export', RISK_COLUMNS, risk_rows),
+}
+
+# Columns stored as numbers in columnar files; everything else is a string.
+# Period stays a string: values such as "P1" or "Lab" would otherwise become null.
+NUMERIC_COLUMNS = {
+    'Amount': 'float64',
+    'Attendance %': 'float64',
+    'Total Risk Factors': 'int64',
+    'Risk Score': 'float64',
+}
+
+
+def export_format(request):
+    """The requested ?format= (default xlsx), or None when unsupported."""
+    fmt = (request.GET.get('format') or 'xlsx').lower()
+    return fmt if fmt in FORMATS else None
+
+
+class _Echo:
+    """csv.writer target that hands back each formatted line."""
+
+    def write(self, value):
+        return value
+
+
+def csv_response(columns, rows, filename):
+    writer = csv.writer(_Echo())
+    lines = (writer.writerow(row) for row in chain([columns], rows))
+    response = StreamingHttpResponse(chunked(lines), content_type=CONTENT_TYPES['csv'])
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def _coerce(value, type_name):
+    if value is None:
+        return None
+    if type_name == 'string':
+        return str(value)
+    try:
+        return int(value) if type_name == 'int64' else float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def write_columnar(fileobj, columns, rows, fmt, batch_rows=PAGE_SIZE * 10):
+    """Write rows to fileobj as a zstd-compressed Parquet or Arrow IPC file, one record batch at a time."""
+    import pyarrow as pa
+
+    types = [NUMERIC_COLUMNS.get(name, 'string') for name in columns]
+    schema = pa.schema([(name, pa.type_for_alias(t)) for name, t in zip(columns, types)])
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        writer = pq.ParquetWriter(fileobj, schema, compression='zstd')
+    else:
+        writer = pa.ipc.new_file(fileobj, schema, options=pa.ipc.IpcWriteOptions(compression='zstd'))
+
+    def flush(batch):
+        arrays = [
+            pa.array([_coerce(v, t) for v in values], type=field.type)
+            for values, t, field in zip(batch, types, schema)
+        ]
+        writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+
+    batch, size = [[] for _ in columns], 0
+    try:
+        for row in rows:
+            for values, value in zip(batch, row):
+                values.append(value)
+            size += 1
+            if size >= batch_rows:
+                flush(batch)
+                batch, size = [[] for _ in columns], 0
+        if size:
+            flush(batch)
+    finally:
+        writer.close()
+
+
+def tabular_response(kind, fmt, filters=None):
+    """CSV/Parquet/Arrow download of an export's record rows.
+    CSV is always streamed fresh; Parquet/Arrow files go through the export cache.
+    """
+    prefix, columns, rows = TABULAR_EXPORTS[kind]
+    filename = f'{prefix}_{timezone.now().strftime("%Y%m%d_%H%M")}.{fmt}'
+    if fmt == 'csv':
+        return csv_response(columns, rows(filters=filters), filename)
+    return artifact_response(
+        kind, fmt, lambda output: write_columnar(output, columns, rows(filters=filters), fmt),
+        filename, CONTENT_TYPES[fmt], params={'filters': filters or {}},
+    )
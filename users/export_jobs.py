@@ -0,0 +1,210 @@
+"""
+Background export jobs.
+
+Building a large workbook inside the request ties up a gunicorn worker and
+runs into GUNICORN_TIMEOUT. enqueue() records an ExportJob and hands it to a
+small in-process thread pool; the worker writes the file under
+MEDIA_ROOT/exports and updates rows_processed as sheets fill up, and clients
+poll the job until it is done, then download the artifact. A partial unique
+constraint allows a single queued/running job per (kind, params), so
+concurrent requests for the same export join the run already in progress.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.urls import reverse
+from django.utils import timezone
+
+from users.export_cache import cached_build, export_cache_key
+from users.exports import (
+    XlsxExport,
+    build_attendance,
+    build_comprehensive,
+    build_fees,
+    build_risk_analysis,
+    build_students,
+)
+from users.models import ExportJob
+
+logger = logging.getLogger(__name__)
+
+ExportKind = namedtuple('ExportKind', 'build filename_prefix roles')
+
+EXPORT_KINDS = {
+    'students': ExportKind(build_students, 'students_export', ('Admin', 'Faculty')),
+    'attendance': ExportKind(build_attendance, 'attendance_export', ('Admin', 'Faculty')),
+    'fees': ExportKind(build_fees, 'fees_export', ('Admin', 'Faculty')),
+    'risk_analysis': ExportKind(build_risk_analysis, 'risk_analysis_export', ('Admin', 'Faculty')),
+    'comprehensive': ExportKind(build_comprehensive, 'comprehensive_report', ('Admin',)),
+}
+
+EXPORT_DIR = 'exports'
+
+# Seconds between rows_processed writes while a job runs
+_PROGRESS_INTERVAL = 1.0
+# Seconds between sweeps of expired jobs (per process)
+_PURGE_INTERVAL = 3600
+_last_purge = 0.0
+
+_pool = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'EXPORT_WORKERS', 2),
+    thread_name_prefix='export-job',
+)
+
+
+def can_export(user, kind: str) -> bool:
+    spec = EXPORT_KINDS.get(kind)
+    return spec is not None and user.is_authenticated and user.role in spec.roles
+
+
+def dedupe_key(kind: str, params: dict) -> str:
+    payload = json.dumps({'kind': kind, 'params': params}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _artifact_path(relative: str) -> str:
+    return os.path.join(settings.MEDIA_ROOT, relative)
+
+
+def _remove_artifact(relative: str):
+    if not relative:
+        return
+    try:
+        os.remove(_artifact_path(relative))
+    except FileNotFoundError:
+        pass
+
+
+def _expire_jobs():
+    """Fail jobs orphaned by a dead process and delete old artifacts."""
+    global _last_purge
+    now = timezone.now()
+    timeout = timedelta(seconds=getattr(settings, 'EXPORT_JOB_TIMEOUT_SECONDS', 3600))
+    ExportJob.objects.filter(
+        status__in=ExportJob.ACTIVE_STATUSES, created_at__lt=now - timeout,
+    ).update(status=ExportJob.STATUS_FAILED, error='Export timed out', finished_at=now)
+
+    if time.time() - _last_purge < _PURGE_INTERVAL:
+        return
+    _last_purge = time.time()
+    ttl = timedelta(seconds=getattr(settings, 'EXPORT_JOB_TTL_SECONDS', 24 * 3600))
+    expired = ExportJob.objects.filter(created_at__lt=now - ttl).exclude(status__in=ExportJob.ACTIVE_STATUSES)
+    for relative in expired.values_list('file_path', flat=True):
+        _remove_artifact(relative)
+    expired.delete()
+
+
+def enqueue(kind: str, user=None, params=None):
+    """Return (job, created). An identical queued/running job is returned instead of starting another."""
+    params = params or {}
+    key = dedupe_key(kind, params)
+    _expire_jobs()
+    for _ in range(2):
+        existing = ExportJob.objects.filter(dedupe_key=key, status__in=ExportJob.ACTIVE_STATUSES).first()
+        if existing is not None:
+            return existing, False
+        try:
+            with transaction.atomic():
+                job = ExportJob.objects.create(
+                    kind=kind, params=params, dedupe_key=key,
+                    requested_by=user if user is not None and user.is_authenticated else None,
+                )
+        except IntegrityError:
+            # Lost the race to another request; join its job
+            continue
+        transaction.on_commit(lambda: _pool.submit(run_job, job.pk))
+        return job, True
+    raise RuntimeError(f'Could not enqueue {kind} export')
+
+
+def run_job(job_id):
+    """Build one export. Runs on the pool; safe to call directly (e.g. from a shell)."""
+    close_old_connections()
+    relative = ''
+    try:
+        claimed = ExportJob.objects.filter(pk=job_id, status=ExportJob.STATUS_QUEUED).update(
+            status=ExportJob.STATUS_RUNNING, started_at=timezone.now(),
+        )
+        if not claimed:
+            return
+        job = ExportJob.objects.get(pk=job_id)
+        spec = EXPORT_KINDS[job.kind]
+        relative = f'{EXPORT_DIR}/{job.pk}.xlsx'
+        path = _artifact_path(relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        last_saved = [0.0]
+
+        def progress(rows):
+            now = time.monotonic()
+            if now - last_saved[0] >= _PROGRESS_INTERVAL:
+                last_saved[0] = now
+                ExportJob.objects.filter(pk=job_id).update(rows_processed=rows)
+
+        rows_written = [0]
+
+        def write(output):
+            export = XlsxExport(output, progress=progress)
+            spec.build(export, **job.params)
+            export.close()
+            rows_written[0] = export.rows_written
+
+        # Write next to the final name so a download never sees a half-written file
+        partial_path = f'{path}.part'
+        key = export_cache_key(job.kind, 'xlsx', job.params)
+        if key is None:
+            with open(partial_path, 'wb') as output:
+                write(output)
+        else:
+            # The job keeps its own link to the artifact, so cache eviction cannot expire it early
+            cached_path, _ = cached_build(key, 'xlsx', write)
+            try:
+                os.link(cached_path, partial_path)
+            except OSError:
+                shutil.copyfile(cached_path, partial_path)
+        os.replace(partial_path, path)
+
+        ExportJob.objects.filter(pk=job_id).update(
+            status=ExportJob.STATUS_DONE,
+            rows_processed=rows_written[0],
+            file_path=relative,
+            filename=f'{spec.filename_prefix}_{timezone.now().strftime("%Y%m%d_%H%M")}.xlsx',
+            finished_at=timezone.now(),
+        )
+    except Exception as e:
+        logger.exception('Export job %s failed', job_id)
+        if relative:
+            _remove_artifact(relative)
+            _remove_artifact(f'{relative}.part')
+        ExportJob.objects.filter(pk=job_id).update(
+            status=ExportJob.STATUS_FAILED, error=str(e)[:1000], finished_at=timezone.now(),
+        )
+    finally:
+        close_old_connections()
+
+
+def job_payload(job) -> dict:
+    payload = {
+        'id': str(job.pk),
+        'kind': job.kind,
+        'status': job.status,
+        'rows_processed': job.rows_processed,
+        'error': job.error,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        'progress_url': reverse('export_job', args=[job.pk]),
+        'download_url': None,
+    }
+    if job.status == ExportJob.STATUS_DONE:
+        payload['download_url'] = reverse('export_job_download', args=[job.pk])
+    return payload
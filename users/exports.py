@@ -0,0 +1,543 @@
+"""
+Excel export builders.
+
+Workbooks are written with xlsxwriter in constant_memory mode: each row is
+flushed to disk as soon as the next one starts, and the finished file lives in
+a temporary file rather than a BytesIO. Record rows are pulled from paginated
+Firestore/queryset iterators, so peak memory no longer grows with the number of
+rows; only the narrow columns needed for summary sheets (student code, flag,
+amount) are kept. Summaries are one groupby pass over those columns with the
+student ids and statuses as categoricals, so they scale linearly with row count
+(see the benchmark_exports management command).
+
+numpy, pandas and xlsxwriter are imported inside the functions that use them so
+that loading the URLconf (and every worker boot) does not pay for them; see the
+benchmark_startup management command.
+"""
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from django.db import connection
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from mini_erp.firebase_utils import count_documents, iter_documents
+from mini_erp.firestore_filters import compile_filters
+from users.models import User
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Firestore documents read per query page
+PAGE_SIZE = 1000
+
+HEADER_STYLE = {
+    'bold': True,
+    'text_wrap': True,
+    'valign': 'top',
+    'border': 1,
+}
+
+
+class Sheet:
+    """A worksheet written strictly top to bottom."""
+
+    def __init__(self, worksheet, columns, on_row=None):
+        self.worksheet = worksheet
+        self.columns = columns
+        self.row = 1
+        self._on_row = on_row
+
+    def append(self, values):
+        self.worksheet.write_row(self.row, 0, values)
+        self.row += 1
+        if self._on_row is not None:
+            self._on_row()
+
+    def write_rows(self, rows):
+        for values in rows:
+            self.append(values)
+
+    @property
+    def rows_written(self):
+        return self.row - 1
+
+
+class XlsxExport:
+    """Constant-memory workbook writer around a binary file object.
+    progress(rows_written) is called every progress_every rows across all sheets
+    and once more from close().
+    """
+
+    def __init__(self, fileobj, progress=None, progress_every=500):
+        import xlsxwriter
+
+        self.workbook = xlsxwriter.Workbook(fileobj, {'constant_memory': True})
+        self._formats = {}
+        self.rows_written = 0
+        self._progress = progress
+        self._progress_every = progress_every
+
+    def _row_written(self):
+        self.rows_written += 1
+        if self._progress is not None and self.rows_written % self._progress_every == 0:
+            self._progress(self.rows_written)
+
+    def format(self, **style):
+        key = tuple(sorted(style.items()))
+        if key not in self._formats:
+            self._formats[key] = self.workbook.add_format(style)
+        return self._formats[key]
+
+    def add_sheet(self, name, columns, header_color='#D7E4BC', width=15, column_formats=None):
+        worksheet = self.workbook.add_worksheet(name)
+        header_format = self.format(fg_color=header_color, **HEADER_STYLE)
+        for col_num, title in enumerate(columns):
+            worksheet.set_column(col_num, col_num, width, (column_formats or {}).get(col_num))
+            worksheet.write(0, col_num, title, header_format)
+        return Sheet(worksheet, columns, on_row=self._row_written)
+
+    def close(self):
+        self.workbook.close()
+        if self._progress is not None:
+            self._progress(self.rows_written)
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+EXPORT_FILTER_PARAMS = ('from', 'to', 'course', 'status', 'student_id')
+
+# Firestore 'in' queries accept at most this many values
+IN_QUERY_LIMIT = 30
+
+
+def clean_export_filters(params) -> dict:
+    """Pick the supported export filters out of request params.
+    from/to must be YYYY-MM-DD; raises ValueError otherwise.
+    """
+    filters = {}
+    for name in EXPORT_FILTER_PARAMS:
+        value = (params.get(name) or '').strip()
+        if not value:
+            continue
+        if name in ('from', 'to'):
+            date.fromisoformat(value)
+        filters[name] = value
+    return filters
+
+
+def course_student_ids(course: str) -> list:
+    from admissions.models import Admission
+    return sorted(set(Admission.objects.filter(course__iexact=course).values_list('student_id', flat=True)))
+
+
+def filtered_documents(collection: str, order_by: str, filters=None):
+    """Yield the documents matching the export filters, pushed down as Firestore where clauses.
+    A course is resolved to its student ids in SQL and queried in blocks of IN_QUERY_LIMIT
+    ids. Firestore drops documents that lack the order_by field (counter payments have
+    no due_date), so rows are only ordered by order_by when a date range on that field
+    excludes those documents anyway; otherwise they come back in document id order.
+    """
+    filters = filters or {}
+    clauses = compile_filters(collection, filters)
+    if not any(field == order_by and op != '==' for field, op, _ in clauses):
+        order_by = None
+    if not filters.get('course'):
+        yield from iter_documents(collection, filters=clauses, order_by=order_by, page_size=PAGE_SIZE)
+        return
+    student_ids = course_student_ids(filters['course'])
+    if filters.get('student_id'):
+        student_ids = [sid for sid in student_ids if sid == filters['student_id']]
+    clauses = [clause for clause in clauses if clause[0] != 'student_id']
+    for start in range(0, len(student_ids), IN_QUERY_LIMIT):
+        block = [('student_id', 'in', student_ids[start:start + IN_QUERY_LIMIT])]
+        yield from iter_documents(collection, filters=clauses + block, order_by=order_by, page_size=PAGE_SIZE)
+
+
+STUDENT_COLUMNS = [
+    'Student ID', 'Name', 'Email', 'Phone', 'Date of Birth', 'Address',
+    'Active', 'Email Verified', 'Created Date',
+]
+
+
+def student_rows(filters=None):
+    filters = filters or {}
+    students = User.objects.filter(role='Student')
+    if filters.get('student_id'):
+        students = students.filter(student_id=filters['student_id'])
+    if filters.get('course'):
+        from admissions.models import Admission
+        students = students.filter(student_id__in=Admission.objects.filter(
+            course__iexact=filters['course']).values('student_id'))
+    if filters.get('status', '').lower() in ('active', 'inactive'):
+        students = students.filter(is_active=filters['status'].lower() == 'active')
+    if filters.get('from'):
+        students = students.filter(created_at__date__gte=filters['from'])
+    if filters.get('to'):
+        students = students.filter(created_at__date__lte=filters['to'])
+    for student in students.order_by('created_at').iterator(chunk_size=2000):
+        yield [
+            student.student_id,
+            student.get_display_name(),
+            student.email,
+            student.phone or 'N/A',
+            student.date_of_birth.isoformat() if student.date_of_birth else 'N/A',
+            student.address or 'N/A',
+            'Yes' if student.is_active else 'No',
+            'Yes' if student.is_email_verified else 'No',
+            student.created_at.strftime('%Y-%m-%d %H:%M') if student.created_at else 'N/A',
+        ]
+
+
+def build_students(export, filters=None):
+    export.add_sheet('Students', STUDENT_COLUMNS).write_rows(student_rows(filters))
+
+
+def attendance_summary(codes, present, student_ids):
+    """Per-student attendance totals from parallel code/flag columns.
+    codes index into student_ids (first-appearance order, which the output keeps).
+    """
+    import numpy as np
+    import pandas as pd
+
+    df = pd.DataFrame({
+        'student': pd.Categorical.from_codes(np.frombuffer(codes, dtype=np.int32), categories=student_ids),
+        'present': np.frombuffer(present, dtype=np.int8),
+    })
+    agg = df.groupby('student', observed=True, sort=True)['present'].agg(['size', 'sum'])
+    total = agg['size'].to_numpy()
+    present_days = agg['sum'].to_numpy()
+    rate = np.round(present_days / np.maximum(total, 1) * 100, 2)
+    return zip(agg.index.astype(str), total.tolist(), present_days.tolist(), (total - present_days).tolist(), rate.tolist())
+
+
+def fee_summary(codes, amounts, status_codes, student_ids, statuses):
+    """Per-student fee totals. Returns rows of (student_id, total, paid, pending, payment status)."""
+    import numpy as np
+    import pandas as pd
+
+    completed_code = statuses.index('Completed') if 'Completed' in statuses else -1
+    amount = np.frombuffer(amounts, dtype=np.float64)
+    status = pd.Categorical.from_codes(np.frombuffer(status_codes, dtype=np.int8), categories=statuses)
+    df = pd.DataFrame({
+        'student': pd.Categorical.from_codes(np.frombuffer(codes, dtype=np.int32), categories=student_ids),
+        'amount': amount,
+        'paid': np.where(status.codes == completed_code, amount, 0.0),
+    })
+    agg = df.groupby('student', observed=True, sort=True)[['amount', 'paid']].sum()
+    total = agg['amount'].to_numpy()
+    paid = agg['paid'].to_numpy()
+    pending = total - paid
+    payment_status = np.where(pending == 0, 'Completed', np.where(paid > 0, 'Partial', 'Pending'))
+    return zip(agg.index.astype(str), total.tolist(), paid.tolist(), pending.tolist(), payment_status.tolist())
+
+
+ATTENDANCE_COLUMNS = ['Student ID', 'Date', 'Present', 'Subject', 'Period', 'Recorded At']
+
+
+def attendance_rows(docs=None, filters=None):
+    if docs is None:
+        docs = filtered_documents('attendance', 'date', filters)
+    for doc in docs:
+        yield [
+            str(doc.get('student_id') or 'N/A'),
+            doc.get('date', 'N/A'),
+            'Yes' if doc.get('present') else 'No',
+            doc.get('subject', 'N/A'),
+            doc.get('period', 'N/A'),
+            doc.get('created_at', 'N/A'),
+        ]
+
+
+ATTENDANCE_SUMMARY_COLUMNS = ['Student ID', 'Total Days', 'Present Days', 'Absent Days', 'Attendance Rate (%)']
+
+
+class AttendanceTotals:
+    """Narrow columns for the attendance summary: student code per row and the present flag."""
+
+    def __init__(self):
+        self.student_codes, self.codes, self.present = {}, array('i'), array('b')
+
+    def add(self, row):
+        self.codes.append(self.student_codes.setdefault(row[0], len(self.student_codes)))
+        self.present.append(row[2] == 'Yes')
+
+    def rows(self):
+        if not self.codes:
+            return iter(())
+        return attendance_summary(self.codes, self.present, list(self.student_codes))
+
+
+def build_attendance(export, docs=None, filters=None):
+    records = export.add_sheet('Attendance Records', ATTENDANCE_COLUMNS)
+    totals = AttendanceTotals()
+    for row in attendance_rows(docs, filters):
+        records.append(row)
+        totals.add(row)
+
+    if not records.rows_written:
+        return
+    export.add_sheet('Attendance Summary', ATTENDANCE_SUMMARY_COLUMNS).write_rows(totals.rows())
+
+
+FEE_COLUMNS = ['Student ID', 'Student Name', 'Fee Type', 'Amount', 'Due Date', 'Status', 'Paid Date', 'Created At']
+
+
+def fee_rows(docs=None, filters=None):
+    if docs is None:
+        docs = filtered_documents('fees', 'due_date', filters)
+    for doc in docs:
+        yield [
+            str(doc.get('student_id') or 'N/A'),
+            doc.get('student_name', 'N/A'),
+            doc.get('fee_type', 'N/A'),
+            _to_float(doc.get('amount', 0)),
+            doc.get('due_date', 'N/A'),
+            (doc.get('status') or 'N/A').title(),
+            doc.get('paid_at', 'N/A'),
+            doc.get('created_at', 'N/A'),
+        ]
+
+
+FEE_SUMMARY_COLUMNS = ['Student ID', 'Student Name', 'Total Amount', 'Paid Amount', 'Pending Amount', 'Payment Status']
+
+
+class FeeTotals:
+    """Narrow columns for per-student fee totals: student code, amount and status code per row."""
+
+    def __init__(self):
+        self.student_codes, self.student_names, self.status_index = {}, [], {}
+        self.codes, self.amounts, self.status_codes = array('i'), array('d'), array('b')
+
+    def add(self, row):
+        sid = row[0]
+        if sid not in self.student_codes:
+            self.student_codes[sid] = len(self.student_codes)
+            self.student_names.append(row[1])
+        self.codes.append(self.student_codes[sid])
+        self.amounts.append(row[3])
+        self.status_codes.append(self.status_index.setdefault(row[5], len(self.status_index)))
+
+    def rows(self):
+        """Yield [student_id, name, total, paid, pending, payment status]."""
+        if not self.codes:
+            return
+        # Summary rows come back in student code order, so the code indexes student_names
+        summary = fee_summary(self.codes, self.amounts, self.status_codes,
+                              list(self.student_codes), list(self.status_index))
+        for code, (student_id, total, paid, pending, payment_status) in enumerate(summary):
+            yield [student_id, self.student_names[code], total, paid, pending, payment_status]
+
+
+def build_fees(export, docs=None, filters=None):
+    header_color = '#FFE6E6'
+    currency = export.format(num_format='$#,##0.00')
+    records = export.add_sheet('Fee Records', FEE_COLUMNS, header_color, column_formats={3: currency})
+    summary = export.add_sheet('Fee Summary', FEE_SUMMARY_COLUMNS, header_color,
+                               column_formats={2: currency, 3: currency, 4: currency})
+    partial = export.add_sheet('Partial Payments', FEE_SUMMARY_COLUMNS[:5], header_color,
+                               column_formats={2: currency, 3: currency, 4: currency})
+    overdue = export.add_sheet('Overdue Fees', FEE_COLUMNS, header_color, column_formats={3: currency})
+
+    today = date.today().isoformat()
+    totals = FeeTotals()
+    for row in fee_rows(docs, filters):
+        records.append(row)
+        if row[5] != 'Completed' and isinstance(row[4], str) and row[4] < today:
+            overdue.append(row)
+        totals.add(row)
+
+    for row in totals.rows():
+        summary.append(row)
+        if row[5] == 'Partial':
+            partial.append(row[:5])
+
+
+RISK_COLUMNS = [
+    'Student ID', 'Attendance %', 'At Risk', 'Overdue Fees', 'Failing Grades', 'Risk Reasons', 'Total Risk Factors',
+    'Risk Score', 'Risk Level',
+]
+
+
+def risk_rows(filters=None):
+    """Risk rows from the shared batch RiskIndex (one cached snapshot of attendance,
+    fees and exams), ordered at-risk first, then by number of risk factors.
+    Only the student_id and course filters apply; risk is evaluated over all history.
+    """
+    from dashboard.risk_engine import get_risk_index
+
+    filters = filters or {}
+    results = get_risk_index().results.values()
+    if filters.get('course'):
+        cohort = set(course_student_ids(filters['course']))
+        results = [r for r in results if r['student_id'] in cohort]
+    if filters.get('student_id'):
+        results = [r for r in results if r['student_id'] == filters['student_id']]
+    ranked = sorted(results, key=lambda r: (r['at_risk'], len(r['reasons'])), reverse=True)
+    for risk in ranked:
+        reasons = risk['reasons']
+        yield [
+            risk['student_id'],
+            risk['attendance_percent'],
+            'Yes' if risk['at_risk'] else 'No',
+            'Yes' if risk['overdue_fees'] else 'No',
+            'Yes' if risk['failing_grades'] else 'No',
+            ', '.join(reasons),
+            len(reasons),
+            risk['risk_score'],
+            risk['risk_level'],
+        ]
+
+
+def _write_risk_sheet(export, rows):
+    sheet = export.add_sheet('Risk Analysis', RISK_COLUMNS, header_color='#FFD700')
+    sheet.write_rows(rows)
+    if not sheet.rows_written:
+        return
+    # One rule for the whole range instead of a row format per at-risk student
+    sheet.worksheet.conditional_format(1, 0, sheet.rows_written, len(RISK_COLUMNS) - 1, {
+        'type': 'formula',
+        'criteria': '=$C2="Yes"',
+        'format': export.format(bg_color='#FFE6E6'),
+    })
+
+
+def build_risk_analysis(export, filters=None):
+    _write_risk_sheet(export, risk_rows(filters))
+
+
+# Comprehensive report sections run concurrently; the workbook is written from
+# the calling thread once each section's rows are ready.
+_section_pool = ThreadPoolExecutor(max_workers=6, thread_name_prefix='export-section')
+
+COUNTED_COLLECTIONS = ['attendance', 'fees', 'exams', 'hostel_requests', 'leaves']
+
+
+def _section(func, *args):
+    """Run func in the pool; ORM connections opened by the worker thread are closed afterwards."""
+    def run():
+        try:
+            return func(*args)
+        finally:
+            connection.close()
+    return _section_pool.submit(run)
+
+
+def _snapshot_attendance_summary(attendance_docs):
+    totals = AttendanceTotals()
+    for row in attendance_rows(attendance_docs):
+        totals.add(row)
+    return list(totals.rows())
+
+
+def _snapshot_fee_ledger(fee_docs):
+    totals = FeeTotals()
+    for row in fee_rows(fee_docs):
+        totals.add(row)
+    return list(totals.rows())
+
+
+def _hostel_occupancy_rows():
+    from applications.models import HostelApplication
+    from hostel.models import HostelCapacity
+
+    applications = {
+        row['preferred_room_type']: row
+        for row in HostelApplication.objects.values('preferred_room_type').annotate(
+            pending=Count('id', filter=Q(status='pending')),
+            approved=Count('id', filter=Q(status='approved')),
+        )
+    }
+    rows = []
+    for capacity in HostelCapacity.objects.order_by('room_type'):
+        counts = applications.get(capacity.room_type, {})
+        rows.append([
+            capacity.get_room_type_display(),
+            capacity.total_capacity,
+            capacity.occupied,
+            capacity.available,
+            round(capacity.occupancy_percentage, 2),
+            counts.get('pending', 0),
+            counts.get('approved', 0),
+        ])
+    return rows
+
+
+def _leave_stats_rows():
+    from applications.models import LeaveApplication
+
+    labels = dict(LeaveApplication.LEAVE_TYPES)
+    stats = LeaveApplication.objects.values('leave_type').annotate(
+        total=Count('id'),
+        pending=Count('id', filter=Q(status='pending')),
+        approved=Count('id', filter=Q(status='approved')),
+        rejected=Count('id', filter=Q(status='rejected')),
+    ).order_by('leave_type')
+    return [
+        [labels.get(row['leave_type'], row['leave_type']), row['total'], row['pending'], row['approved'], row['rejected']]
+        for row in stats
+    ]
+
+
+def _student_counts():
+    students = User.objects.filter(role='Student')
+    return students.count(), students.filter(is_active=True).count()
+
+
+def build_comprehensive(export, generated_by=''):
+    """Multi-sheet report. Record counts come from Firestore aggregation queries;
+    every other section is derived from one shared cached snapshot of
+    attendance/fees/exams (the same one the risk index uses) or from the ORM.
+    """
+    from dashboard.risk_engine import load_risk_collections
+
+    counts = {name: _section(count_documents, name) for name in COUNTED_COLLECTIONS}
+    student_counts = _section(_student_counts)
+    students = _section(lambda: list(student_rows()))
+    hostel = _section(_hostel_occupancy_rows)
+    leaves = _section(_leave_stats_rows)
+    attendance_docs, fee_docs, _ = load_risk_collections()
+    attendance = _section(_snapshot_attendance_summary, attendance_docs)
+    ledger = _section(_snapshot_fee_ledger, fee_docs)
+    risk = _section(lambda: list(risk_rows()))
+    generated_on = timezone.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    ranked_risk = risk.result()
+    total_students, active_students = student_counts.result()
+    summary = export.add_sheet('Summary', ['Metric', 'Value'], width=30)
+    summary.write_rows([
+        ['Total Students', total_students],
+        ['Active Students', active_students],
+        ['Total Attendance Records', counts['attendance'].result()],
+        ['Total Fee Records', counts['fees'].result()],
+        ['Total Exam Records', counts['exams'].result()],
+        ['Hostel Requests', counts['hostel_requests'].result()],
+        ['Leave Requests', counts['leaves'].result()],
+        ['Students At Risk', sum(1 for row in ranked_risk if row[2] == 'Yes')],
+        ['Report Generated', generated_on],
+    ])
+
+    export.add_sheet('Students', STUDENT_COLUMNS).write_rows(students.result())
+    export.add_sheet('Attendance Summary', ATTENDANCE_SUMMARY_COLUMNS).write_rows(attendance.result())
+    currency = export.format(num_format='$#,##0.00')
+    export.add_sheet('Fee Ledger', FEE_SUMMARY_COLUMNS, '#FFE6E6',
+                     column_formats={2: currency, 3: currency, 4: currency}).write_rows(ledger.result())
+    _write_risk_sheet(export, ranked_risk)
+    export.add_sheet('Hostel Occupancy', [
+        'Room Type', 'Capacity', 'Occupied', 'Available', 'Occupancy (%)', 'Pending Applications', 'Approved Applications',
+    ], header_color='#E2EFDA').write_rows(hostel.result())
+    export.add_sheet('Leave Stats', ['Leave Type', 'Total', 'Pending', 'Approved', 'Rejected'],
+                     header_color='#E2EFDA').write_rows(leaves.result())
+
+    info = export.add_sheet('Report Info', ['Field', 'Value'])
+    info.write_rows([
+        ['Note', 'This is a comprehensive report generated from the Mini ERP system'],
+        ['Generated By', generated_by],
+        ['Generated On', generated_on],
+        ['System', 'Mini ERP - Student Management System'],
+    ])
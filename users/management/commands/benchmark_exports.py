@@ -0,0 +1,87 @@
+import random
+import resource
+import tempfile
+import time
+from array import array
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+
+from users.exports import XlsxExport, attendance_summary, build_attendance, fee_summary
+
+
+def _synthetic_attendance(rows, students):
+    start = date(2025, 1, 1)
+    for i in range(rows):
+        yield {
+            'student_id': f'STU{i % students:05d}',
+            'date': (start + timedelta(days=(i // students) % 365)).isoformat(),
+            'present': random.random() < 0.85,
+            'subject': 'Mathematics',
+            'period': (i % 6) + 1,
+            'created_at': '2025-01-01T09:00:00Z',
+        }
+
+
+class Command(BaseCommand):
+    help = 'Time export summaries (and optionally full attendance workbooks) at growing row counts to check linear scaling'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=str,
+            default='10000,100000,1000000',
+            help='Comma-separated row counts',
+        )
+        parser.add_argument(
+            '--students',
+            type=int,
+            default=5000,
+            help='Distinct students in the synthetic data',
+        )
+        parser.add_argument(
+            '--workbook',
+            action='store_true',
+            help='Also write the full attendance workbook (records + summary) to a temp file',
+        )
+
+    def handle(self, *args, **options):
+        sizes = [int(s) for s in options['sizes'].split(',') if s.strip()]
+        students = options['students']
+        student_ids = [f'STU{i:05d}' for i in range(students)]
+        statuses = ['Completed', 'Pending', 'Overdue']
+        baseline = None
+
+        self.stdout.write(f"{'rows':>10} {'attendance s':>13} {'fees s':>8} {'us/row':>8} {'vs first':>9} {'workbook s':>11} {'max RSS MB':>11}")
+        for rows in sizes:
+            codes = array('i', (i % students for i in range(rows)))
+            present = array('b', (random.random() < 0.85 for _ in range(rows)))
+            amounts = array('d', (random.choice((500.0, 1200.0, 2500.0)) for _ in range(rows)))
+            status_codes = array('b', (random.randrange(len(statuses)) for _ in range(rows)))
+
+            started = time.perf_counter()
+            for _ in attendance_summary(codes, present, student_ids):
+                pass
+            attendance_s = time.perf_counter() - started
+
+            started = time.perf_counter()
+            for _ in fee_summary(codes, amounts, status_codes, student_ids, statuses):
+                pass
+            fees_s = time.perf_counter() - started
+
+            per_row = (attendance_s + fees_s) / rows * 1e6
+            baseline = baseline or per_row
+            workbook_s = '-'
+            if options['workbook']:
+                started = time.perf_counter()
+                with tempfile.TemporaryFile() as output:
+                    export = XlsxExport(output)
+                    build_attendance(export, docs=_synthetic_attendance(rows, students))
+                    export.close()
+                workbook_s = f'{time.perf_counter() - started:.2f}'
+            max_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+            self.stdout.write(
+                f'{rows:>10} {attendance_s:>13.3f} {fees_s:>8.3f} {per_row:>8.3f} '
+                f'{per_row / baseline:>8.2f}x {workbook_s:>11} {max_rss_mb:>11.0f}'
+            )
+        self.stdout.write(self.style.SUCCESS('Per-row cost staying near 1.00x across sizes means linear scaling'))
@@ -0,0 +1,110 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+# Libraries that should only load inside export/PDF code paths
+HEAVY_MODULES = ('pandas', 'numpy', 'xlsxwriter', 'pyarrow', 'reportlab', 'openpyxl', 'weasyprint')
+
+# What a gunicorn worker does before serving its first request
+BOOT_CODE = '''
+import os, resource
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mini_erp.settings')
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+'''
+
+
+def _parse_importtime(stderr):
+    """Return [(module, self_us, cumulative_us, depth)] from python -X importtime output."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+            depth = (len(name) - len(name.lstrip(' '))) // 2
+            entries.append((name.strip(), int(self_us), int(cumulative_us), depth))
+        except ValueError:
+            continue
+    return entries
+
+
+class Command(BaseCommand):
+    help = 'Measure worker cold start (python -X importtime of django.setup() + URLconf) and flag heavy imports'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=3, help='Boots to measure (median is reported)')
+        parser.add_argument('--top', type=int, default=15, help='Slowest top-level imports to list')
+        parser.add_argument(
+            '--record',
+            type=str,
+            help='Append the result as one JSON line to this file to track startup over time',
+        )
+        parser.add_argument(
+            '--fail-on-heavy',
+            action='store_true',
+            help='Exit with an error if any of the heavy libraries is imported at boot',
+        )
+
+    def _boot(self):
+        started = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', BOOT_CODE],
+            cwd=str(settings.BASE_DIR),
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'mini_erp.settings')},
+            capture_output=True,
+            text=True,
+        )
+        wall_ms = (time.perf_counter() - started) * 1000
+        if result.returncode != 0:
+            raise CommandError(f'Boot failed:\n{result.stderr[-2000:]}')
+        max_rss_kb = int(result.stdout.strip().splitlines()[-1])
+        return wall_ms, max_rss_kb, _parse_importtime(result.stderr)
+
+    def handle(self, *args, **options):
+        boots = [self._boot() for _ in range(max(1, options['runs']))]
+        wall_ms = statistics.median(b[0] for b in boots)
+        rss_mb = statistics.median(b[1] for b in boots) / 1024
+        entries = boots[-1][2]
+        import_ms = sum(cumulative for _, _, cumulative, depth in entries if depth == 0) / 1000
+        loaded = {name for name, _, _, _ in entries}
+        heavy = sorted(m for m in HEAVY_MODULES if m in loaded)
+
+        self.stdout.write(f'Boot wall time (median of {len(boots)}): {wall_ms:.0f} ms')
+        self.stdout.write(f'Import time: {import_ms:.0f} ms')
+        self.stdout.write(f'Max RSS: {rss_mb:.1f} MB')
+        self.stdout.write("\nSlowest top-level imports:")
+        top_level = sorted((e for e in entries if e[3] == 0), key=lambda e: e[2], reverse=True)
+        for name, _, cumulative, _ in top_level[:options['top']]:
+            self.stdout.write(f'  {cumulative / 1000:>8.1f} ms  {name}')
+
+        if heavy:
+            self.stdout.write(self.style.WARNING(f"\nHeavy libraries imported at boot: {', '.join(heavy)}"))
+        else:
+            self.stdout.write(self.style.SUCCESS('\nNo heavy libraries imported at boot'))
+
+        if options['record']:
+            record = {
+                'timestamp': timezone.now().isoformat(),
+                'python': sys.version.split()[0],
+                'wall_ms': round(wall_ms, 1),
+                'import_ms': round(import_ms, 1),
+                'max_rss_mb': round(rss_mb, 1),
+                'heavy_modules': heavy,
+            }
+            with open(options['record'], 'a', encoding='utf-8') as fh:
+                fh.write(json.dumps(record) + '\n')
+            self.stdout.write(f"Recorded to {options['record']}")
+
+        if heavy and options['fail_on_heavy']:
+            raise CommandError(f"Heavy libraries imported at boot: {', '.join(heavy)}")
@@ -1,5 +1,7 @@
 from django.core.management.base import BaseCommand
 from mini_erp.firebase_utils import add_document, get_all_documents
+from mini_erp.firestore_filters import normalize_document
+from students.inbox import add_notifications
 from users.models import User
 import random
 from datetime import datetime, date, timedelta
@@ -115,7 +117,7 @@ class Command(BaseCommand):
             if status == 'completed':
                 doc['paid_at'] = (due_date + timedelta(days=random.randint(-5, 5))).isoformat()
             
-            add_document('fees', doc)
+            add_document('fees', normalize_document('fees', doc))
 
     def generate_exam_data(self, student_id, student):
         """Generate exam scores with some failing grades"""
@@ -155,7 +157,7 @@ class Command(BaseCommand):
                 'exam_type': random.choice(['Midterm', 'Final', 'Quiz', 'Assignment']),
                 'created_at': datetime.utcnow().isoformat() + 'Z'
             }
-            add_document('exams', doc)
+            add_document('exams', normalize_document('exams', doc))
 
     def generate_leave_data(self, student_id, student):
         """Generate leave applications"""
@@ -222,5 +224,5 @@ class Command(BaseCommand):
             }
         ]
         
-        for notification in notifications:
-            add_document('notifications', notification)
\ No newline at end of file
+        # Goes through the inbox so the unread counter stays in step
+        add_notifications(notifications)
\ No newline at end of file
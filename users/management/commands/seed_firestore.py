@@ -5,6 +5,7 @@ from mini_erp.firebase_utils import (
     initialize_firebase, add_document, get_firestore_client,
     get_all_documents, delete_document
 )
+from mini_erp.firestore_filters import normalize_document
 import json
 from datetime import datetime
 
@@ -313,7 +314,7 @@ class Command(BaseCommand):
         
         # Add fees to Firestore
         for fee in fees_data:
-            add_document('fees', fee, fee['transaction_id'])
+            add_document('fees', normalize_document('fees', fee), fee['transaction_id'])
         
         # Sample hostel requests
         hostel_requests = []
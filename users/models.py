@@ -1,3 +1,5 @@
+import uuid
+
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.utils import timezone
@@ -137,3 +139,55 @@ class User(AbstractUser):
                 self.employee_id = f'{prefix}{int(time.time() * 1000) % 100000:05d}'
         
         super().save(*args, **kwargs)
+
+
+class ExportJob(models.Model):
+    """A spreadsheet export built in the background (see users/export_jobs.py).
+    dedupe_key hashes (kind, params); at most one queued/running job exists per
+    key, so concurrent requests for the same export share one run.
+    """
+
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    ACTIVE_STATUSES = (STATUS_QUEUED, STATUS_RUNNING)
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=50)
+    params = models.JSONField(default=dict, blank=True)
+    dedupe_key = models.CharField(max_length=64, db_index=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    rows_processed = models.PositiveIntegerField(default=0)
+    file_path = models.CharField(max_length=255, blank=True, help_text='Artifact path relative to MEDIA_ROOT')
+    filename = models.CharField(max_length=255, blank=True, help_text='Download filename')
+    error = models.TextField(blank=True)
+    requested_by = models.ForeignKey(
+        'users.User', null=True, blank=True, on_delete=models.SET_NULL, related_name='export_jobs',
+    )
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dedupe_key'],
+                condition=models.Q(status__in=['queued', 'running']),
+                name='unique_active_export_job',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} export ({self.status})'
+
+    @property
+    def is_active(self):
+        return self.status in self.ACTIVE_STATUSES
@@ -0,0 +1,45 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from users import exports
+
+
+def _firestore_stream(documents):
+    """Stand-in for iter_documents with Firestore's ordering semantics:
+    documents missing the order_by field are left out of the result.
+    """
+    def stream(collection, filters=None, order_by=None, page_size=None):
+        docs = documents
+        for field, op, value in filters or []:
+            if op == '==':
+                docs = [d for d in docs if d.get(field) == value]
+            elif op == '>=':
+                docs = [d for d in docs if field in d and d[field] >= value]
+            elif op == '<=':
+                docs = [d for d in docs if field in d and d[field] <= value]
+        if order_by:
+            docs = sorted((d for d in docs if order_by in d), key=lambda d: d[order_by])
+        return iter(docs)
+    return stream
+
+
+FEES = [
+    {'id': 'a', 'student_id': 'STU1', 'fee_type': 'Tuition', 'amount': 500, 'due_date': '2025-01-10', 'status': 'pending'},
+    # Counter payment from fees.views.fee_payment: no due_date
+    {'id': 'b', 'student_id': 'STU2', 'fee_type': 'Hostel Fee', 'amount': '1200.00', 'status': 'completed'},
+]
+
+
+class FeeExportTests(SimpleTestCase):
+    def test_fee_without_due_date_is_exported(self):
+        with mock.patch.object(exports, 'iter_documents', _firestore_stream(FEES)):
+            rows = list(exports.fee_rows())
+        self.assertEqual([row[0] for row in rows], ['STU1', 'STU2'])
+        self.assertEqual(rows[1][4], 'N/A')
+        self.assertEqual(rows[1][3], 1200.0)
+
+    def test_due_date_range_still_filters(self):
+        with mock.patch.object(exports, 'iter_documents', _firestore_stream(FEES)):
+            rows = list(exports.fee_rows(filters={'from': '2025-01-01'}))
+        self.assertEqual([row[0] for row in rows], ['STU1'])
@@ -26,4 +26,7 @@ urlpatterns = [
     path('export/fees/', export_views.export_fees_excel, name='export_fees'),
     path('export/risk-analysis/', export_views.export_risk_analysis_excel, name='export_risk_analysis'),
     path('export/comprehensive/', export_views.export_comprehensive_report, name='export_comprehensive'),
+    path('export/jobs/', export_views.export_job_create, name='export_job_create'),
+    path('export/jobs/<uuid:job_id>/', export_views.export_job_status, name='export_job'),
+    path('export/jobs/<uuid:job_id>/download/', export_views.export_job_download, name='export_job_download'),
 ]